@@ -75,8 +75,9 @@ def run_migrations_online() -> None:
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
-            # 只管理 order_tasks 表，忽略其他表
-            include_tables=['order_tasks']
+            # 只管理本服务的表，忽略其他表
+            include_tables=['order_tasks', 'order_cooldowns', 'order_task_daily_stats', 'idempotency_keys',
+                            'order_tasks_archive']
         )
 
         with context.begin_transaction():
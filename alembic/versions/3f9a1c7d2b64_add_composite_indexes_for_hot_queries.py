@@ -0,0 +1,51 @@
+"""add_composite_indexes_for_hot_queries
+
+Revision ID: 3f9a1c7d2b64
+Revises: c5e50f614f22
+Create Date: 2026-10-17 06:05:12.418530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c7d2b64'
+down_revision: Union[str, Sequence[str], None] = 'c5e50f614f22'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _existing_indexes() -> set[str]:
+    """当前 order_tasks 表上已有的索引名"""
+    inspector = sa.inspect(op.get_bind())
+    return {index["name"] for index in inspector.get_indexes("order_tasks")}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 24小时冷却检查：WHERE user_name = ? AND shop_name = ? AND created_at > ? ORDER BY created_at DESC
+    op.create_index(
+        'idx_user_shop_created', 'order_tasks',
+        ['user_name', 'shop_name', 'created_at'], unique=False
+    )
+    # 当前任务查询：WHERE user_name = ? AND order_status = 1 ORDER BY created_at DESC
+    op.create_index(
+        'idx_user_status_created', 'order_tasks',
+        ['user_name', 'order_status', 'created_at'], unique=False
+    )
+
+    # 由 database/schema.sql 建出的库上存在单列 idx_user_name，
+    # 它是上面两个复合索引的前缀，保留只会增加写入开销
+    if 'idx_user_name' in _existing_indexes():
+        op.drop_index('idx_user_name', table_name='order_tasks')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if 'idx_user_name' not in _existing_indexes():
+        op.create_index('idx_user_name', 'order_tasks', ['user_name'], unique=False)
+    op.drop_index('idx_user_status_created', table_name='order_tasks')
+    op.drop_index('idx_user_shop_created', table_name='order_tasks')
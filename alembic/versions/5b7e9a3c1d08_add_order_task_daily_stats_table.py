@@ -0,0 +1,36 @@
+"""add_order_task_daily_stats_table
+
+Revision ID: 5b7e9a3c1d08
+Revises: 8d21e6b0c4a7
+Create Date: 2026-10-17 07:31:46.275903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e9a3c1d08'
+down_revision: Union[str, Sequence[str], None] = '8d21e6b0c4a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 汇总表建好后为空，需要执行 python scripts/rebuild_stats.py 从 order_tasks 分块回填
+    op.create_table(
+        'order_task_daily_stats',
+        sa.Column('stat_date', sa.Date(), nullable=False, comment='任务创建日期（UTC）'),
+        sa.Column('shop_name', sa.String(length=200), nullable=False, comment='店铺名称'),
+        sa.Column('order_status', sa.Integer(), nullable=False, comment='下单进度：1-进行中、2-完成、3-失败'),
+        sa.Column('task_count', sa.Integer(), nullable=False, comment='任务数'),
+        sa.PrimaryKeyConstraint('stat_date', 'shop_name', 'order_status'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('order_task_daily_stats')
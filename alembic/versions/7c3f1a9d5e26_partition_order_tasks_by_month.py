@@ -0,0 +1,103 @@
+"""partition_order_tasks_by_month
+
+Revision ID: 7c3f1a9d5e26
+Revises: a4c2e8f61b93
+Create Date: 2026-10-17 10:05:41.862013
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3f1a9d5e26'
+down_revision: Union[str, Sequence[str], None] = 'a4c2e8f61b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 迁移时额外建好的未来月份分区数（之后由 scripts/archive_tasks.py 按 PARTITION_AHEAD_MONTHS 补齐）
+AHEAD_MONTHS = 3
+
+# 归档回迁时复制的列（与 order_tasks 相同）
+TASK_COLUMNS = (
+    "id, task_uuid, user_name, shop_name, product_url, product_price, product_sku, order_status, "
+    "error_message, order_id, alipay_trade_no, receiver_name, receiver_address, receiver_phone, "
+    "created_at, updated_at, completed_at"
+)
+
+
+def _add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _partition_clause() -> str:
+    """从最早任务所在月份到当前月 + AHEAD_MONTHS 逐月分区，边界为 UTC 月初的 Unix 时间戳"""
+    earliest = op.get_bind().execute(sa.text("SELECT UNIX_TIMESTAMP(MIN(created_at)) FROM order_tasks")).scalar()
+    now = datetime.now(timezone.utc)
+    first = datetime.fromtimestamp(int(earliest), timezone.utc) if earliest is not None else now
+    month = first.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    last = _add_months(now.replace(day=1, hour=0, minute=0, second=0, microsecond=0), AHEAD_MONTHS)
+
+    definitions = []
+    while month <= last:
+        bound = int(_add_months(month, 1).timestamp())
+        definitions.append(f"PARTITION p{month:%Y%m} VALUES LESS THAN ({bound})")
+        month = _add_months(month, 1)
+    definitions.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+    return "PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (" + ", ".join(definitions) + ")"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'order_tasks_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False, comment='原任务ID'),
+        sa.Column('archived_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False, comment='归档时间'),
+        sa.Column('task_uuid', sa.BINARY(length=16), nullable=False, comment='任务唯一标识UUID'),
+        sa.Column('user_name', sa.String(length=100), nullable=False, comment='用户名'),
+        sa.Column('shop_name', sa.String(length=200), nullable=False, comment='店铺名称'),
+        sa.Column('product_url', sa.String(length=1000), nullable=False, comment='商品链接'),
+        sa.Column('product_price', sa.DECIMAL(precision=10, scale=2), nullable=False, comment='商品价格'),
+        sa.Column('product_sku', sa.String(length=100), nullable=False, comment='商品SKU'),
+        sa.Column('order_status', sa.Integer(), nullable=True, comment='下单进度：1-进行中、2-完成、3-失败'),
+        sa.Column('error_message', sa.TEXT(), nullable=True, comment='失败原因（当状态为失败时）'),
+        sa.Column('order_id', sa.String(length=100), nullable=True, comment='订单号（当状态为完成时）'),
+        sa.Column('alipay_trade_no', sa.String(length=100), nullable=True, comment='支付宝交易号'),
+        sa.Column('receiver_name', sa.String(length=100), nullable=True, comment='收货人姓名'),
+        sa.Column('receiver_address', sa.String(length=500), nullable=True, comment='收货地址'),
+        sa.Column('receiver_phone', sa.String(length=20), nullable=True, comment='收货人手机号'),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True, comment='更新时间'),
+        sa.Column('completed_at', sa.TIMESTAMP(timezone=True), nullable=True, comment='完成时间'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('idx_archive_task_uuid', 'order_tasks_archive', ['task_uuid'], unique=True)
+    op.create_index('idx_archive_user_created', 'order_tasks_archive', ['user_name', 'created_at'], unique=False)
+
+    # 分区表的每个唯一键都必须包含分区列：task_uuid 改为普通索引，主键扩展为 (id, created_at)
+    op.create_index('idx_task_uuid', 'order_tasks', ['task_uuid'], unique=False)
+    op.drop_index('task_uuid', table_name='order_tasks')
+    op.execute("UPDATE order_tasks SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL")
+    op.execute("ALTER TABLE order_tasks MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间'")
+
+    # 分区需要重建整张表并锁写，数据量大时在维护窗口执行，或改用 gh-ost / pt-online-schema-change 执行这条 DDL
+    op.execute("ALTER TABLE order_tasks DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at) " + _partition_clause())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE order_tasks REMOVE PARTITIONING")
+    op.execute("ALTER TABLE order_tasks DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
+    op.execute("ALTER TABLE order_tasks MODIFY created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间'")
+    op.create_index('task_uuid', 'order_tasks', ['task_uuid'], unique=True)
+    op.drop_index('idx_task_uuid', table_name='order_tasks')
+
+    # 已归档的任务搬回任务表，避免删除归档表时丢数据
+    op.execute(f"INSERT INTO order_tasks ({TASK_COLUMNS}) SELECT {TASK_COLUMNS} FROM order_tasks_archive")
+    op.drop_index('idx_archive_user_created', table_name='order_tasks_archive')
+    op.drop_index('idx_archive_task_uuid', table_name='order_tasks_archive')
+    op.drop_table('order_tasks_archive')
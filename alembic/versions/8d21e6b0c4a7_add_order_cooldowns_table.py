@@ -0,0 +1,53 @@
+"""add_order_cooldowns_table
+
+Revision ID: 8d21e6b0c4a7
+Revises: 3f9a1c7d2b64
+Create Date: 2026-10-17 06:40:31.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d21e6b0c4a7'
+down_revision: Union[str, Sequence[str], None] = '3f9a1c7d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'order_cooldowns',
+        sa.Column('user_name', sa.String(length=100), nullable=False, comment='用户名'),
+        sa.Column('shop_name', sa.String(length=200), nullable=False, comment='店铺名称'),
+        sa.Column('task_uuid', sa.String(length=36), nullable=False, comment='占用冷却期的任务UUID'),
+        sa.Column('cooldown_until', sa.DateTime(), nullable=False, comment='冷却截止时间（UTC）'),
+        sa.PrimaryKeyConstraint('user_name', 'shop_name'),
+    )
+
+    # 回填最近24小时内已有的下单任务，避免上线瞬间出现重复下单
+    # TIMESTAMP 按会话时区显示，切到 UTC 后与 cooldown_until 的存储口径一致
+    op.execute("SET time_zone = '+00:00'")
+    op.execute("""
+        INSERT IGNORE INTO order_cooldowns (user_name, shop_name, task_uuid, cooldown_until)
+        SELECT t.user_name, t.shop_name, t.task_uuid, t.created_at + INTERVAL 24 HOUR
+        FROM order_tasks t
+        JOIN (
+            SELECT user_name, shop_name, MAX(created_at) AS created_at
+            FROM order_tasks
+            WHERE created_at > UTC_TIMESTAMP() - INTERVAL 24 HOUR
+            GROUP BY user_name, shop_name
+        ) latest
+          ON latest.user_name = t.user_name
+         AND latest.shop_name = t.shop_name
+         AND latest.created_at = t.created_at
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('order_cooldowns')
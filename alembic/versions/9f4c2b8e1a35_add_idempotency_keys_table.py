@@ -0,0 +1,37 @@
+"""add_idempotency_keys_table
+
+Revision ID: 9f4c2b8e1a35
+Revises: e1b5d3a7c902
+Create Date: 2026-10-17 15:48:02.771036
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f4c2b8e1a35'
+down_revision: Union[str, Sequence[str], None] = 'e1b5d3a7c902'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('idempotency_key', sa.String(length=255), nullable=False, comment='客户端传入的 Idempotency-Key'),
+        sa.Column('request_hash', sa.String(length=64), nullable=False, comment='请求方法、路径和请求体的 SHA-256'),
+        sa.Column('response_body', sa.TEXT(), nullable=False, comment='首次处理的响应（JSON）'),
+        sa.Column('expires_at', sa.DateTime(), nullable=False, comment='过期时间（UTC）'),
+        sa.PrimaryKeyConstraint('idempotency_key'),
+    )
+    op.create_index('idx_idempotency_expires', 'idempotency_keys', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_idempotency_expires', table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,77 @@
+"""store_task_uuid_as_binary
+
+Revision ID: a4c2e8f61b93
+Revises: 5b7e9a3c1d08
+Create Date: 2026-10-17 08:12:03.517244
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c2e8f61b93'
+down_revision: Union[str, Sequence[str], None] = '5b7e9a3c1d08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 每批转换的ID范围，每批单独提交，避免一次 UPDATE 锁住整张表、撑大 undo log
+BATCH_SIZE = 10000
+
+
+def _uuid_indexes(table: str) -> list[str]:
+    """只包含 task_uuid 一列的索引（建表时的 UNIQUE 和 schema.sql 中重复的 idx_task_uuid）"""
+    inspector = sa.inspect(op.get_bind())
+    return [
+        index["name"] for index in inspector.get_indexes(table)
+        if index["column_names"] == ["task_uuid"]
+    ]
+
+
+def _convert_in_batches(expression: str) -> None:
+    """分批把 task_uuid 转换后写入 task_uuid_new，最后补齐转换期间新插入的行"""
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM order_tasks")).scalar()
+    with op.get_context().autocommit_block():
+        for start in range(0, max_id + 1, BATCH_SIZE):
+            bind.execute(
+                sa.text(f"UPDATE order_tasks SET task_uuid_new = {expression} WHERE id >= :start AND id < :end"),
+                {"start": start, "end": start + BATCH_SIZE},
+            )
+        bind.execute(sa.text(f"UPDATE order_tasks SET task_uuid_new = {expression} WHERE task_uuid_new IS NULL"))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # order_tasks: 新增二进制列 -> 分批转换 -> 删除旧列和索引 -> 新列改名并建唯一索引
+    op.execute("ALTER TABLE order_tasks ADD COLUMN task_uuid_new BINARY(16) NULL AFTER task_uuid")
+    _convert_in_batches("UUID_TO_BIN(task_uuid)")
+    for name in _uuid_indexes('order_tasks'):
+        op.drop_index(name, table_name='order_tasks')
+    op.execute("ALTER TABLE order_tasks DROP COLUMN task_uuid")
+    op.execute("ALTER TABLE order_tasks CHANGE task_uuid_new task_uuid BINARY(16) NOT NULL COMMENT '任务唯一标识UUID'")
+    op.create_index('task_uuid', 'order_tasks', ['task_uuid'], unique=True)
+
+    # order_cooldowns 每个用户-店铺只有一行，数据量小，一条 UPDATE 转换
+    op.execute("ALTER TABLE order_cooldowns ADD COLUMN task_uuid_new BINARY(16) NULL AFTER task_uuid")
+    op.execute("UPDATE order_cooldowns SET task_uuid_new = UUID_TO_BIN(task_uuid)")
+    op.execute("ALTER TABLE order_cooldowns DROP COLUMN task_uuid")
+    op.execute("ALTER TABLE order_cooldowns CHANGE task_uuid_new task_uuid BINARY(16) NOT NULL COMMENT '占用冷却期的任务UUID'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE order_cooldowns ADD COLUMN task_uuid_new VARCHAR(36) NULL AFTER task_uuid")
+    op.execute("UPDATE order_cooldowns SET task_uuid_new = BIN_TO_UUID(task_uuid)")
+    op.execute("ALTER TABLE order_cooldowns DROP COLUMN task_uuid")
+    op.execute("ALTER TABLE order_cooldowns CHANGE task_uuid_new task_uuid VARCHAR(36) NOT NULL COMMENT '占用冷却期的任务UUID'")
+
+    op.execute("ALTER TABLE order_tasks ADD COLUMN task_uuid_new VARCHAR(36) NULL AFTER task_uuid")
+    _convert_in_batches("BIN_TO_UUID(task_uuid)")
+    for name in _uuid_indexes('order_tasks'):
+        op.drop_index(name, table_name='order_tasks')
+    op.execute("ALTER TABLE order_tasks DROP COLUMN task_uuid")
+    op.execute("ALTER TABLE order_tasks CHANGE task_uuid_new task_uuid VARCHAR(36) NOT NULL COMMENT '任务唯一标识UUID'")
+    op.create_index('task_uuid', 'order_tasks', ['task_uuid'], unique=True)
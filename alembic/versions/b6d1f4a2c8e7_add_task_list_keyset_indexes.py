@@ -0,0 +1,51 @@
+"""add_task_list_keyset_indexes
+
+Revision ID: b6d1f4a2c8e7
+Revises: 9f4c2b8e1a35
+Create Date: 2026-10-17 16:52:40.118263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d1f4a2c8e7'
+down_revision: Union[str, Sequence[str], None] = '9f4c2b8e1a35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _existing_indexes() -> set[str]:
+    """当前 order_tasks 表上已有的索引名"""
+    inspector = sa.inspect(op.get_bind())
+    return {index["name"] for index in inspector.get_indexes("order_tasks")}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 任务列表：ORDER BY created_at DESC, id DESC LIMIT ?，可选 user_name / shop_name 等值过滤
+    op.create_index('idx_created_id', 'order_tasks', ['created_at', 'id'], unique=False)
+    op.create_index('idx_shop_created_id', 'order_tasks', ['shop_name', 'created_at', 'id'], unique=False)
+    op.create_index('idx_user_created_id', 'order_tasks', ['user_name', 'created_at', 'id'], unique=False)
+
+    # 由 database/schema.sql 建出的库上存在单列 idx_created_at / idx_shop_name，
+    # 它们是上面索引的前缀，保留只会增加写入开销
+    existing = _existing_indexes()
+    for name in ('idx_created_at', 'idx_shop_name'):
+        if name in existing:
+            op.drop_index(name, table_name='order_tasks')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    existing = _existing_indexes()
+    if 'idx_shop_name' not in existing:
+        op.create_index('idx_shop_name', 'order_tasks', ['shop_name'], unique=False)
+    if 'idx_created_at' not in existing:
+        op.create_index('idx_created_at', 'order_tasks', ['created_at'], unique=False)
+    op.drop_index('idx_user_created_id', table_name='order_tasks')
+    op.drop_index('idx_shop_created_id', table_name='order_tasks')
+    op.drop_index('idx_created_id', table_name='order_tasks')
@@ -0,0 +1,34 @@
+"""add_task_lease_columns
+
+Revision ID: e1b5d3a7c902
+Revises: 7c3f1a9d5e26
+Create Date: 2026-10-17 14:26:18.304519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1b5d3a7c902'
+down_revision: Union[str, Sequence[str], None] = '7c3f1a9d5e26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('order_tasks', sa.Column('lease_owner', sa.String(length=100), nullable=True, comment='领取任务的 worker 标识'))
+    op.add_column('order_tasks', sa.Column('lease_expires_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False, comment='租约到期时间'))
+    # 已有的进行中任务按创建时间排队领取；updated_at 写回原值，不触发 ON UPDATE
+    op.execute("UPDATE order_tasks SET lease_expires_at = created_at, updated_at = updated_at WHERE order_status = 1")
+    op.create_index('idx_status_lease', 'order_tasks', ['order_status', 'lease_expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_status_lease', table_name='order_tasks')
+    op.drop_column('order_tasks', 'lease_expires_at')
+    op.drop_column('order_tasks', 'lease_owner')
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+API 压测 / 基准脚本
+
+用本地 SQLite 作为数据库替身，分别以进程内 ASGI 客户端（只测应用本身）和
+真实 uvicorn 进程（包含 HTTP 解析和网络栈）两种方式驱动接口，
+按场景输出吞吐量和 p50/p95/p99 延迟，结果保存为 JSON 便于前后对比
+
+场景：
+  create     每个请求一个新用户，走完整的冷却预占 + 插入流程
+  duplicate  同一用户-店铺重复下单，验证冷却拒绝路径
+  patch      把预先创建的任务更新为完成
+  current    查询用户当前进行中的任务
+
+示例：
+  python benchmarks/bench_api.py -n 2000 -c 32
+  python benchmarks/bench_api.py --mode uvicorn --scenarios create,current
+  python benchmarks/bench_api.py --compare benchmarks/results/上次结果.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+import httpx
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+SCENARIOS = ("create", "duplicate", "patch", "current")
+PRODUCT = {"product_url": "https://example.com/item/1", "product_price": 99.9, "product_sku": "BENCH-SKU"}
+SETUP_BATCH_SIZE = 500  # 与 BATCH_MAX_SIZE 默认值一致
+
+
+def percentile(sorted_values, pct):
+    """最近秩法取百分位"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    """汇总单个场景的结果（延迟单位毫秒）"""
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+async def run_load(make_request, total, concurrency):
+    """
+    以固定并发执行 total 个请求
+
+    make_request(i) 返回 (请求协程, 期望的 success 值)；HTTP 非 200 或 success 不符都计为错误
+    """
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < total:
+            i = next_index
+            next_index += 1
+            request, expect_success = make_request(i)
+            started = time.perf_counter()
+            try:
+                response = await request
+                ok = response.status_code == 200 and response.json().get("success") is expect_success
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def create_tasks(client, users, shop_name):
+    """通过批量接口预先创建任务，返回 task_uuid 列表"""
+    task_uuids = []
+    for start in range(0, len(users), SETUP_BATCH_SIZE):
+        response = await client.post("/orders/batch", json=[
+            {"user_name": user, "shop_name": shop_name, **PRODUCT}
+            for user in users[start:start + SETUP_BATCH_SIZE]
+        ])
+        response.raise_for_status()
+        task_uuids.extend(result["task_uuid"] for result in response.json()["results"] if result["success"])
+    return task_uuids
+
+
+async def run_scenarios(client, run_id, scenarios, total, concurrency):
+    """依次执行各场景，每个场景使用独立的用户名，互不干扰"""
+    results = {}
+
+    for scenario in scenarios:
+        prefix = f"bench-{run_id}-{scenario}"
+
+        if scenario == "create":
+            def make_request(i):
+                return client.post("/orders", json={"user_name": f"{prefix}-{i}", "shop_name": "bench-shop", **PRODUCT}), True
+
+        elif scenario == "duplicate":
+            await create_tasks(client, [prefix], "bench-shop")
+
+            def make_request(i):
+                return client.post("/orders", json={"user_name": prefix, "shop_name": "bench-shop", **PRODUCT}), False
+
+        elif scenario == "patch":
+            task_uuids = await create_tasks(client, [f"{prefix}-{i}" for i in range(total)], "bench-shop")
+
+            def make_request(i):
+                return client.patch(f"/orders/{task_uuids[i % len(task_uuids)]}", json={
+                    "order_id": f"BENCH{i:012d}", "alipay_trade_no": f"2025{i:016d}",
+                    "receiver_name": "压测", "receiver_address": "压测地址", "receiver_phone": "13800000000",
+                }), True
+
+        elif scenario == "current":
+            users = [f"{prefix}-{i}" for i in range(min(total, 1000))]
+            await create_tasks(client, users, "bench-shop")
+
+            def make_request(i):
+                return client.get(f"/users/{users[i % len(users)]}/orders/current"), True
+
+        print(f"  ▶️  {scenario}: {total} 个请求，并发 {concurrency}")
+        results[scenario] = await run_load(make_request, total, concurrency)
+        print_result(scenario, results[scenario])
+
+    return results
+
+
+def print_result(scenario, result, baseline=None):
+    line = (
+        f"     {scenario:<10} {result['throughput_rps']:>9.1f} req/s  "
+        f"p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms  "
+        f"错误 {result['errors']}"
+    )
+    if baseline:
+        delta = (result["throughput_rps"] / baseline["throughput_rps"] - 1) * 100 if baseline["throughput_rps"] else 0
+        line += f"  (吞吐 {delta:+.1f}%，p95 {baseline['p95_ms']:.2f}ms -> {result['p95_ms']:.2f}ms)"
+    print(line)
+
+
+async def bench_inprocess(args, run_id):
+    """进程内 ASGI 客户端：不经过网络，只测量应用和数据库的开销"""
+    from src.database import create_tables, warm_up_pool
+    import main
+
+    create_tables()
+    await warm_up_pool()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return await run_scenarios(client, run_id, args.scenarios, args.requests, args.concurrency)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def bench_uvicorn(args, run_id, env):
+    """启动真实的 uvicorn 进程，通过本机 HTTP 连接压测"""
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=project_root, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn 进程启动失败")
+                await asyncio.sleep(0.2)
+            return await run_scenarios(client, run_id, args.scenarios, args.requests, args.concurrency)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OrderTracker API 基准测试")
+    parser.add_argument("-n", "--requests", type=int, default=1000, help="每个场景的请求数")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="并发数")
+    parser.add_argument("-m", "--mode", choices=["inprocess", "uvicorn", "both"], default="both", help="驱动方式")
+    parser.add_argument("-s", "--scenarios", default=",".join(SCENARIOS), help="逗号分隔的场景列表")
+    parser.add_argument("--database-url", help="同步数据库连接串（默认在临时目录新建 SQLite 文件）")
+    parser.add_argument("-o", "--output", help="结果 JSON 路径（默认 benchmarks/results/<时间>.json）")
+    parser.add_argument("--compare", help="与之前保存的结果 JSON 对比")
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"未知场景: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="ordertracker-bench-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    # 数据库连接串在导入 src.database 时读取，必须先设置环境变量；压测期间关闭业务日志
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("DB_POOL_WARMUP", "false")
+
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    modes = ["inprocess", "uvicorn"] if args.mode == "both" else [args.mode]
+
+    print("🚀 OrderTracker API 基准测试")
+    print(f"   数据库: {database_url}")
+
+    results = {}
+    for mode in modes:
+        print(f"\n📊 {mode}")
+        if mode == "inprocess":
+            results[mode] = asyncio.run(bench_inprocess(args, f"{run_id}-in"))
+        else:
+            results[mode] = asyncio.run(bench_uvicorn(args, f"{run_id}-uv", dict(os.environ)))
+
+    report = {
+        "meta": {
+            "run_id": run_id,
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database_url": database_url,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(project_root, "benchmarks", "results", f"{run_id}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 结果已保存: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\n🔍 对比 {args.compare}（{baseline['meta'].get('git_revision')}）")
+        for mode, scenarios in results.items():
+            print(f"  {mode}")
+            for scenario, result in scenarios.items():
+                print_result(scenario, result, baseline["results"].get(mode, {}).get(scenario))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+响应序列化微基准
+
+对比 GET /users/{user_name}/orders/current 单次请求在“取数 + 序列化”上消耗的 CPU 时间：
+  旧路径  查询 ORM 对象 -> model_validate(对象) -> FastAPI 按 response_model 再校验、转换 -> 标准库 json 编码
+  新路径  列投影查询普通行 -> model_validate(行) -> model_dump_json 直接输出字节
+
+数据库使用内存 SQLite，只统计本进程 CPU 时间（time.process_time），不含网络和数据库 I/O 等待
+
+示例：
+  python benchmarks/bench_serialization.py -n 20000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+# 模型模块在导入时读取连接串；这里只用内存库，避免连接默认的 MySQL
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_model_field
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from src.database import Base, OrderTask
+from src.models import CurrentTaskResponse, OrderTaskDetail
+from src.queries import current_task_query
+from src.serialization import model_response
+
+USER_NAME = "bench-user"
+
+
+def setup_session() -> Session:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    session.add(OrderTask(
+        user_name=USER_NAME, shop_name="压测店铺", product_url="https://example.com/item/1",
+        product_price=99.9, product_sku="BENCH-SKU", order_id="2856526176708641363",
+        alipay_trade_no="2025073122001895161402512358", receiver_name="压测",
+        receiver_address="浙江省杭州市西湖区压测路 1 号", receiver_phone="13800000000",
+    ))
+    session.commit()
+    return session
+
+
+def measure(fn, iterations: int) -> float:
+    """返回单次调用的平均 CPU 时间（微秒）"""
+    for _ in range(min(1000, iterations)):
+        fn()
+    started = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - started) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="响应序列化微基准")
+    parser.add_argument("-n", "--iterations", type=int, default=20000, help="每项的循环次数")
+    args = parser.parse_args()
+
+    session = setup_session()
+    response_field = create_model_field(name="response", type_=CurrentTaskResponse, mode="serialization")
+    orm_query = select(OrderTask).where(OrderTask.user_name == USER_NAME, OrderTask.order_status == 1) \
+        .order_by(OrderTask.created_at.desc()).limit(1)
+    row_query = current_task_query(USER_NAME)
+
+    def fetch_orm():
+        session.expunge_all()
+        return session.execute(orm_query).scalars().first()
+
+    def fetch_row():
+        return session.execute(row_query).first()
+
+    orm_task = fetch_orm()
+    row_task = fetch_row()
+
+    def build(task):
+        return CurrentTaskResponse(success=True, message="ok", task=OrderTaskDetail.model_validate(task))
+
+    def serialize_old(response):
+        # FastAPI（锁定版本 0.116）处理 response_model 的方式：模型先转为字典，按 response_model 再校验一次，
+        # 转为可 JSON 化的对象，最后由标准库 json 编码
+        content = response.model_dump(by_alias=True)
+        value, _ = response_field.validate(content, {}, loc=("response",))
+        return JSONResponse(response_field.serialize(value)).body
+
+    def serialize_new(response):
+        return model_response(response).body
+
+    response = build(row_task)
+    stages = [
+        ("取数", lambda: fetch_orm(), lambda: fetch_row()),
+        ("构造模型", lambda: build(orm_task), lambda: build(row_task)),
+        ("序列化", lambda: serialize_old(response), lambda: serialize_new(response)),
+        ("合计", lambda: serialize_old(build(fetch_orm())), lambda: serialize_new(build(fetch_row()))),
+    ]
+
+    print(f"📊 单次请求 CPU 时间（{args.iterations} 次平均，微秒）")
+    print(f"   {'阶段':<8}{'旧路径':>10}{'新路径':>10}{'节省':>10}")
+    for name, old, new in stages:
+        old_us = measure(old, args.iterations)
+        new_us = measure(new, args.iterations)
+        print(f"   {name:<8}{old_us:>10.1f}{new_us:>10.1f}{(1 - new_us / old_us) * 100:>9.1f}%")
+
+
+if __name__ == "__main__":
+    main()
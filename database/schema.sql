@@ -2,32 +2,95 @@
 -- 商品下单任务管理系统
 
 -- 7. 商品下单任务表（用于保存商品数据和下单进度）
+-- 按 created_at 的 UTC 月份分区，分区表的唯一键必须包含分区列，主键为 (id, created_at)，task_uuid 为普通索引；
+-- 这里只建兜底分区，月份分区由 scripts/archive_tasks.py 补齐
 CREATE TABLE order_tasks (
-    id INT PRIMARY KEY AUTO_INCREMENT,
-    task_uuid VARCHAR(36) NOT NULL UNIQUE COMMENT '任务唯一标识UUID',
+    id INT AUTO_INCREMENT,
+    task_uuid BINARY(16) NOT NULL COMMENT '任务唯一标识UUID（UUIDv7，16字节二进制）',
     user_name VARCHAR(100) NOT NULL COMMENT '用户名',
     shop_name VARCHAR(200) NOT NULL COMMENT '店铺名称',
     product_url VARCHAR(1000) NOT NULL COMMENT '商品链接',
     product_price DECIMAL(10,2) NOT NULL COMMENT '商品价格',
     product_sku VARCHAR(100) NOT NULL COMMENT '商品SKU',
-    order_status ENUM('进行中', '完成', '失败') DEFAULT '进行中' COMMENT '下单进度：进行中、完成、失败',
+    order_status INT NOT NULL DEFAULT 1 COMMENT '下单进度：1-进行中、2-完成、3-失败',
     error_message TEXT COMMENT '失败原因（当状态为失败时）',
     order_id VARCHAR(100) COMMENT '订单号（当状态为完成时）',
     alipay_trade_no VARCHAR(100) COMMENT '支付宝交易号',
     receiver_name VARCHAR(100) COMMENT '收货人姓名',
     receiver_address VARCHAR(500) COMMENT '收货地址',
     receiver_phone VARCHAR(20) COMMENT '收货人手机号',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
     completed_at TIMESTAMP NULL COMMENT '完成时间',
+    lease_owner VARCHAR(100) NULL COMMENT '领取任务的 worker 标识',
+    lease_expires_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '租约到期时间',
+    PRIMARY KEY (id, created_at),
+    INDEX idx_task_uuid (task_uuid),
     INDEX idx_order_status (order_status),
-    INDEX idx_created_at (created_at),
-    INDEX idx_shop_name (shop_name),
-    INDEX idx_user_name (user_name),
-    INDEX idx_task_uuid (task_uuid)
-) COMMENT '商品下单任务表';
+    INDEX idx_user_shop_created (user_name, shop_name, created_at),
+    INDEX idx_user_status_created (user_name, order_status, created_at),
+    INDEX idx_status_lease (order_status, lease_expires_at),
+    INDEX idx_created_id (created_at, id),
+    INDEX idx_shop_created_id (shop_name, created_at, id),
+    INDEX idx_user_created_id (user_name, created_at, id)
+) COMMENT '商品下单任务表'
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
 
--- 创建视图：下单任务统计
+-- 下单任务归档表（已完成 / 失败的历史任务，由 scripts/archive_tasks.py 从 order_tasks 分块迁入）
+CREATE TABLE order_tasks_archive (
+    id INT NOT NULL PRIMARY KEY COMMENT '原任务ID',
+    archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '归档时间',
+    task_uuid BINARY(16) NOT NULL COMMENT '任务唯一标识UUID',
+    user_name VARCHAR(100) NOT NULL COMMENT '用户名',
+    shop_name VARCHAR(200) NOT NULL COMMENT '店铺名称',
+    product_url VARCHAR(1000) NOT NULL COMMENT '商品链接',
+    product_price DECIMAL(10,2) NOT NULL COMMENT '商品价格',
+    product_sku VARCHAR(100) NOT NULL COMMENT '商品SKU',
+    order_status INT COMMENT '下单进度：1-进行中、2-完成、3-失败',
+    error_message TEXT COMMENT '失败原因（当状态为失败时）',
+    order_id VARCHAR(100) COMMENT '订单号（当状态为完成时）',
+    alipay_trade_no VARCHAR(100) COMMENT '支付宝交易号',
+    receiver_name VARCHAR(100) COMMENT '收货人姓名',
+    receiver_address VARCHAR(500) COMMENT '收货地址',
+    receiver_phone VARCHAR(20) COMMENT '收货人手机号',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    updated_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP COMMENT '更新时间',
+    completed_at TIMESTAMP NULL COMMENT '完成时间',
+    UNIQUE INDEX idx_archive_task_uuid (task_uuid),
+    INDEX idx_archive_user_created (user_name, created_at)
+) COMMENT '下单任务归档表';
+
+-- 用户-店铺下单冷却表（24小时下单限制的原子预占）
+CREATE TABLE order_cooldowns (
+    user_name VARCHAR(100) NOT NULL COMMENT '用户名',
+    shop_name VARCHAR(200) NOT NULL COMMENT '店铺名称',
+    task_uuid BINARY(16) NOT NULL COMMENT '占用冷却期的任务UUID',
+    cooldown_until DATETIME NOT NULL COMMENT '冷却截止时间（UTC）',
+    PRIMARY KEY (user_name, shop_name)
+) COMMENT '用户-店铺下单冷却表';
+
+-- 下单任务按日统计汇总表（随任务创建、状态变更增量维护，可用 scripts/rebuild_stats.py 重建）
+CREATE TABLE order_task_daily_stats (
+    stat_date DATE NOT NULL COMMENT '任务创建日期（UTC）',
+    shop_name VARCHAR(200) NOT NULL COMMENT '店铺名称',
+    order_status INT NOT NULL COMMENT '下单进度：1-进行中、2-完成、3-失败',
+    task_count INT NOT NULL DEFAULT 0 COMMENT '任务数',
+    PRIMARY KEY (stat_date, shop_name, order_status)
+) COMMENT '下单任务按日统计汇总表';
+
+-- 幂等键表（带 Idempotency-Key 的写请求首次成功的响应，过期记录由 scripts/archive_tasks.py 清理）
+CREATE TABLE idempotency_keys (
+    idempotency_key VARCHAR(255) NOT NULL COMMENT '客户端传入的 Idempotency-Key',
+    request_hash VARCHAR(64) NOT NULL COMMENT '请求方法、路径和请求体的 SHA-256',
+    response_body TEXT NOT NULL COMMENT '首次处理的响应（JSON）',
+    expires_at DATETIME NOT NULL COMMENT '过期时间（UTC）',
+    PRIMARY KEY (idempotency_key),
+    INDEX idx_idempotency_expires (expires_at)
+) COMMENT '幂等键表';
+
+-- 创建视图：下单任务统计（每次读取都会全表 GROUP BY，接口改为读取 order_task_daily_stats）
 CREATE VIEW order_task_stats AS
 SELECT
     order_status,
@@ -36,3 +99,10 @@ SELECT
 FROM order_tasks
 GROUP BY order_status, DATE(created_at)
 ORDER BY task_date DESC, order_status;
+
+-- Alembic 版本记录：本文件对应的迁移版本，scripts/serve.py 启动时校验（新增迁移时同步更新）
+CREATE TABLE alembic_version (
+    version_num VARCHAR(32) NOT NULL,
+    PRIMARY KEY (version_num)
+);
+INSERT INTO alembic_version (version_num) VALUES ('b6d1f4a2c8e7');
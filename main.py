@@ -3,36 +3,123 @@
 OrderTracker FastAPI应用
 """
 
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from fastapi import FastAPI, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, inspect, select
+from typing import List, Optional
 import uvicorn
-from datetime import datetime, timedelta, timezone
+import base64
+import json
+import os
+import logging
+from datetime import date, datetime, timezone
 from contextlib import asynccontextmanager
 
 # 导入自定义模块
-from src.database import get_db, OrderTask, create_tables
+from src.logger import setup_logging, get_logger, log_event
+from src.metrics import (
+    registry, MetricsMiddleware, COOLDOWN_REJECTIONS, TASKS_CLAIMED, CallbackGauge, CallbackCounter, instrument_engine, register_cache
+)
+from src.database import (
+    get_async_db, get_async_engine, on_async_engine_created, OrderTask, create_tables_async,
+    new_task_uuid, canonical_task_uuid, warm_up_pool, DB_POOL_WARMUP
+)
+from src.startup import STARTUP_SCHEMA_MODE, StartupTimer, verify_schema
+from src.queries import current_task_query, task_list_query, export_query, estimate_row_count
+from src.cooldown import (
+    reserve_cooldown, reserve_cooldowns, cached_cooldown, remember_cooldown, cooldown_cache, to_naive_utc
+)
 from src.models import (
-    ProductRequest, ProductResponse, OrderTaskDetail,
-    UpdateOrderInfoRequest, CurrentTaskResponse
+    ProductRequest, ProductResponse, BatchProductResponse, OrderTaskDetail, OrderTaskListResponse, OrderStatusEnum,
+    OrderTaskStats, OrderTaskStatsResponse,
+    UpdateOrderInfoRequest, CurrentTaskResponse, BulkUpdateOrderItem, BulkUpdateOrderResponse,
+    TaskChangeEvent, TaskWaitResponse, PendingUpdateResponse,
+    ClaimTasksRequest, ClaimTasksResponse, TaskLeaseRequest, TaskLeaseResponse
+)
+from src.export import EXPORT_WRITERS, MEDIA_TYPES
+from src.serialization import model_response
+from src.task_cache import current_task_cache, invalidate_updated_tasks
+from src.replicas import replica_router, get_read_db, pin_task_owners
+from src.events import (
+    change_bus, task_event, task_topic, user_topic, sse_stream, next_event, publish_task_updates
 )
+from src.write_behind import write_behind, WRITE_BEHIND_ENABLED, WRITE_BEHIND_WINDOW
+from src.stats import StatDeltas, apply_stat_deltas, stat_date, query_stats
+from src.order_updates import build_update_values, changes_status, update_task, bulk_update_tasks
+from src.idempotency import IdempotentRequest, idempotency_store, idempotent
+from src.task_leases import (
+    claim_tasks, renew_lease, release_lease, CLAIM_MAX_SIZE, TASK_LEASE_SECONDS, TASK_LEASE_MAX_SECONDS
+)
+
+# 日志在导入时配置，uvicorn 的每个 worker 进程都会生效
+setup_logging()
+logger = get_logger("ordertracker")
+
+# 启动各阶段耗时（从应用模块加载完成开始计时）
+startup_timer = StartupTimer()
 
 # 应用生命周期管理
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    # 启动时的初始化操作
-    try:
-        create_tables()
-        print("✅ 数据库表创建/检查完成")
-    except Exception as e:
-        print(f"❌ 数据库初始化失败: {e}")
+    # 启动时的初始化操作：按 STARTUP_SCHEMA_MODE 建表或校验迁移版本
+    with startup_timer.phase("schema"):
+        if STARTUP_SCHEMA_MODE == "create":
+            try:
+                await create_tables_async()
+                log_event(logger, "database_ready", mode="create")
+            except Exception as e:
+                log_event(logger, "database_init_failed", logging.ERROR, error=str(e))
+        elif STARTUP_SCHEMA_MODE == "verify":
+            try:
+                source = await verify_schema(get_async_engine())
+            except Exception as e:
+                # 表结构与代码不一致时拒绝启动
+                log_event(logger, "database_init_failed", logging.ERROR, mode="verify", error=str(e))
+                raise
+            log_event(logger, "database_ready", mode="verify", source=source)
+
+    # 预先建立连接池中的常驻连接，避免发布后的第一批请求承担建连耗时
+    if DB_POOL_WARMUP:
+        with startup_timer.phase("pool_warmup"):
+            try:
+                warmed = await warm_up_pool()
+                log_event(logger, "db_pool_warmed", connections=warmed)
+            except Exception as e:
+                log_event(logger, "db_pool_warmup_failed", logging.WARNING, error=str(e))
+
+    # 写入队列：重放上次未落库的更新并启动后台落库任务
+    if WRITE_BEHIND_ENABLED:
+        with startup_timer.phase("write_behind"):
+            await write_behind.start()
+
+    startup_timer.report(logger, schema_mode=STARTUP_SCHEMA_MODE)
 
     yield
 
-    # 关闭时的清理操作
-    print("🔄 应用正在关闭...")
+    # 关闭时的清理操作：先把写入队列中的更新落库
+    if WRITE_BEHIND_ENABLED:
+        try:
+            await write_behind.stop()
+        except Exception as e:
+            # 未落库的更新仍保留在日志文件中，下次启动时重放
+            log_event(logger, "write_behind_flush_failed", logging.ERROR, error=str(e))
+
+    log_event(logger, "app_shutdown")
+
+# 连接池耗尽时建议客户端的重试间隔（秒）
+DB_BUSY_RETRY_AFTER = int(os.getenv("DB_BUSY_RETRY_AFTER", "1"))
+
+# 任务列表每页最大条数
+LIST_MAX_LIMIT = 200
+
+# 长轮询单次最长等待秒数（需小于反向代理的读超时）
+LONG_POLL_MAX_TIMEOUT = 60
+
+# 批量下单单次最大任务数
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "500"))
 
 # 创建FastAPI应用实例
 app = FastAPI(
@@ -42,57 +129,116 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# 请求计数 / 延迟直方图、数据库语句耗时和连接池状态
+app.add_middleware(MetricsMiddleware)
+on_async_engine_created(instrument_engine)
+register_cache("cooldown", cooldown_cache)
+register_cache("current_task", current_task_cache)
+register_cache("idempotency", idempotency_store)
+registry.register(CallbackCounter(
+    "ordertracker_idempotent_replays_total", "按 Idempotency-Key 重放已保存响应的次数",
+    lambda: [((source,), count) for source, count in idempotency_store.replays.items()],
+    labelnames=("source",)
+))
+registry.register(CallbackGauge(
+    "ordertracker_write_behind_pending", "写入队列中等待落库的更新请求数",
+    lambda: [((), write_behind.pending_count())]
+))
+registry.register(CallbackGauge(
+    "ordertracker_startup_phase_seconds", "本进程启动各阶段耗时（秒）",
+    lambda: [((name,), round(seconds, 6)) for name, seconds in startup_timer.phases.items()],
+    labelnames=("phase",)
+))
+registry.register(CallbackGauge(
+    "ordertracker_db_replica_healthy", "只读副本是否参与读请求分配（1 可用，0 已摘除）",
+    lambda: [((replica.name,), int(replica.healthy)) for replica in replica_router.replicas],
+    labelnames=("replica",)
+))
+registry.register(CallbackCounter(
+    "ordertracker_db_replica_ejections_total", "只读副本被摘除的次数",
+    lambda: [((replica.name,), replica.ejections) for replica in replica_router.replicas],
+    labelnames=("replica",)
+))
+registry.register(CallbackGauge(
+    "ordertracker_event_subscribers", "任务变更事件订阅数（SSE 连接和长轮询）",
+    lambda: [((), change_bus.subscriber_count())]
+))
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request, exc):
+    """连接池在 DB_POOL_TIMEOUT 内没有空闲连接时快速返回 503，而不是让请求继续排队"""
+    log_event(logger, "db_pool_saturated", logging.WARNING, path=request.url.path, outcome="rejected")
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "message": "数据库连接繁忙，请稍后重试"},
+        headers={"Retry-After": str(DB_BUSY_RETRY_AFTER)}
+    )
+
 @app.get("/health")
 async def health_check():
     """健康检查接口"""
     return {"status": "healthy", "service": "OrderTracker"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus 文本格式指标"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def cooldown_rejection(user_name: str, shop_name: str, holder_uuid: str,
+                       cooldown_until: datetime, now_utc: datetime) -> ProductResponse:
+    """构造24小时冷却期内重复下单的失败响应"""
+    # 计算距离可以重新下单还需要多长时间
+    remaining_time = cooldown_until - now_utc
+    remaining_hours = int(remaining_time.total_seconds() // 3600)
+    remaining_minutes = int((remaining_time.total_seconds() % 3600) // 60)
+
+    return ProductResponse(
+        success=False,
+        message=f"用户 '{user_name}' 在店铺 '{shop_name}' 24小时内已有下单任务，还需等待 {remaining_hours}小时{remaining_minutes}分钟后才能重新下单",
+        task_uuid=holder_uuid  # 返回最新订单的UUID
+    )
+
+IDEMPOTENCY_KEY_HEADER = Header(
+    None, alias="Idempotency-Key", min_length=1, max_length=255,
+    description="幂等键：网络重试时携带同一个值，返回首次成功的响应而不是重新执行"
+)
+
 @app.post("/orders", response_model=ProductResponse)
-async def create_order_task(product: ProductRequest, db: Session = Depends(get_db)):
+async def create_order_task(
+    product: ProductRequest,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: Optional[str] = IDEMPOTENCY_KEY_HEADER
+):
     """
     创建订单任务
 
     接收商品信息并创建下单任务
     如果同一用户在同一店铺已有下单任务，则返回失败
     不同用户可以在同一店铺下单
+    带 Idempotency-Key 请求头时，同一个键的重试直接返回首次成功的响应
     """
+    return await idempotent(
+        db, idempotency_key, "POST /orders", product,
+        lambda request: create_order(product, db, request)
+    )
+
+async def create_order(product: ProductRequest, db: AsyncSession,
+                       idempotent_request: Optional[IdempotentRequest]) -> Response:
+    """创建订单任务；带幂等键时成功响应与任务在同一事务中保存"""
     try:
-        # 检查用户名和店铺名的组合在24小时内是否已经下过单
-        # 计算24小时前的时间点（使用UTC时间确保与数据库时间一致）
         now_utc = datetime.now(timezone.utc)
-        twenty_four_hours_ago = now_utc - timedelta(hours=24)
-
-        # 查询该用户在该店铺最近24小时内的下单记录
-        recent_task = db.query(OrderTask).filter(
-            OrderTask.user_name == product.user_name,
-            OrderTask.shop_name == product.shop_name,
-            OrderTask.created_at > twenty_four_hours_ago
-        ).order_by(OrderTask.created_at.desc()).first()
-
-        if recent_task:
-            # 计算距离可以重新下单还需要多长时间
-            # 确保时间计算的一致性，将数据库时间转换为UTC进行比较
-            if recent_task.created_at.tzinfo is None:
-                # 如果数据库时间是naive datetime，假设它是UTC时间
-                recent_task_utc = recent_task.created_at.replace(tzinfo=timezone.utc)
-            else:
-                recent_task_utc = recent_task.created_at.astimezone(timezone.utc)
-
-            time_since_last_order = now_utc - recent_task_utc
-            remaining_time = timedelta(hours=24) - time_since_last_order
-            remaining_hours = int(remaining_time.total_seconds() // 3600)
-            remaining_minutes = int((remaining_time.total_seconds() % 3600) // 60)
 
-            print(f"❌ 用户 '{product.user_name}' 在店铺 '{product.shop_name}' 24小时内已有下单任务")
-            # 显示本地时间给用户看
-            local_time = recent_task_utc.astimezone()
-            print(f"   最近下单时间: {local_time.strftime('%Y-%m-%d %H:%M:%S')} (本地时间)")
-            print(f"   还需等待: {remaining_hours}小时{remaining_minutes}分钟")
-
-            return ProductResponse(
-                success=False,
-                message=f"用户 '{product.user_name}' 在店铺 '{product.shop_name}' 24小时内已有下单任务，还需等待 {remaining_hours}小时{remaining_minutes}分钟后才能重新下单",
-                task_uuid=recent_task.task_uuid  # 返回最新订单的UUID
+        # 冷却期缓存命中时直接拒绝，不访问数据库
+        cached = cached_cooldown(product.user_name, product.shop_name, now_utc)
+        if cached is not None:
+            holder_uuid, cooldown_until = cached
+            log_event(
+                logger, "order_rejected", task_uuid=holder_uuid, user_name=product.user_name,
+                shop_name=product.shop_name, outcome="cooldown", source="cache"
+            )
+            COOLDOWN_REJECTIONS.inc("cache")
+            return model_response(
+                cooldown_rejection(product.user_name, product.shop_name, holder_uuid, cooldown_until, now_utc)
             )
 
         # 创建新的下单任务
@@ -105,169 +251,814 @@ async def create_order_task(product: ProductRequest, db: Session = Depends(get_d
             order_status=1  # 进行中
         )
 
-        # 保存到数据库
+        # 原子预占该用户在该店铺的24小时冷却期
+        # 并发请求中只有一个能预占成功，其余请求拿到的是已有任务的UUID
+        holder_uuid, cooldown_until = await reserve_cooldown(
+            db, product.user_name, product.shop_name, new_task.task_uuid, now_utc
+        )
+
+        if holder_uuid != new_task.task_uuid:
+            await db.rollback()
+            remember_cooldown(product.user_name, product.shop_name, holder_uuid, cooldown_until)
+            log_event(
+                logger, "order_rejected", task_uuid=holder_uuid, user_name=product.user_name,
+                shop_name=product.shop_name, outcome="cooldown", source="db"
+            )
+            COOLDOWN_REJECTIONS.inc("db")
+            return model_response(
+                cooldown_rejection(product.user_name, product.shop_name, holder_uuid, cooldown_until, now_utc)
+            )
+
+        # 保存到数据库（与冷却预占、统计汇总在同一事务中提交），flush 取回自增ID用于响应
         db.add(new_task)
-        db.commit()
-        db.refresh(new_task)
-
-        print(f"✅ 创建下单任务成功:")
-        print(f"  任务ID: {new_task.id}")
-        print(f"  任务UUID: {new_task.task_uuid}")
-        print(f"  用户名: {new_task.user_name}")
-        print(f"  店铺名称: {new_task.shop_name}")
-        print(f"  商品链接: {new_task.product_url}")
-        print(f"  商品价格: {new_task.product_price}")
-        print(f"  商品SKU: {new_task.product_sku}")
-
-        return ProductResponse(
+        await db.flush()
+        # 统计日期取数据库写入的 created_at，与 rebuild_stats.py 的口径一致（不受应用时钟偏差影响）；
+        # 支持 RETURNING 的数据库 flush 时已取回，MySQL 按主键读回
+        if "created_at" in inspect(new_task).unloaded:
+            await db.refresh(new_task, ["created_at"])
+        await apply_stat_deltas(db, StatDeltas({(stat_date(new_task.created_at), product.shop_name, 1): 1}))
+        response = ProductResponse(
             success=True,
             message="商品下单任务创建成功",
             task_id=new_task.id,
             task_uuid=new_task.task_uuid
         )
+        if idempotent_request is not None:
+            await idempotent_request.save(db, response)
+        await db.commit()
+        remember_cooldown(product.user_name, product.shop_name, new_task.task_uuid, cooldown_until)
+        # 先标记读己之写再失效缓存：失效之后的读请求都走主库，不会把副本上的旧结果写回缓存
+        await replica_router.pin_users([product.user_name])
+        await current_task_cache.invalidate_users([product.user_name])
+        change_bus.publish(task_event(
+            "created", new_task.id, new_task.task_uuid, product.user_name, product.shop_name, new_task.order_status
+        ))
+
+        log_event(
+            logger, "order_created", task_id=new_task.id, task_uuid=new_task.task_uuid,
+            user_name=new_task.user_name, shop_name=new_task.shop_name,
+            product_sku=new_task.product_sku, outcome="created"
+        )
 
+        return model_response(response)
+
+    except PoolTimeoutError:
+        # 连接池已满，交给全局异常处理返回 503
+        raise
     except Exception as e:
-        db.rollback()
-        print(f"❌ 创建下单任务失败: {str(e)}")
-        return ProductResponse(success=False, message=f"创建任务失败: {str(e)}")
+        await db.rollback()
+        log_event(
+            logger, "order_create_failed", logging.ERROR, user_name=product.user_name,
+            shop_name=product.shop_name, outcome="error", error=str(e)
+        )
+        return model_response(ProductResponse(success=False, message=f"创建任务失败: {str(e)}"))
+
+
+@app.post("/orders/batch", response_model=BatchProductResponse)
+async def create_order_tasks_batch(products: List[ProductRequest], db: AsyncSession = Depends(get_async_db)):
+    """
+    批量创建订单任务
+
+    一次提交多个商品下单请求，results 与请求列表按顺序一一对应
+    冷却期检查通过一条批量 upsert 和一次分组查询完成，通过检查的任务在同一事务中批量写入
+    同一批次内重复的用户-店铺组合只有第一条会被创建
+    """
+    if not products:
+        return BatchProductResponse(success=False, message="下单列表不能为空")
+    if len(products) > BATCH_MAX_SIZE:
+        return BatchProductResponse(
+            success=False,
+            message=f"单次最多提交 {BATCH_MAX_SIZE} 个下单任务，当前 {len(products)} 个"
+        )
+
+    try:
+        now_utc = datetime.now(timezone.utc)
+
+        # 每个用户-店铺组合的最终冷却状态：(持有者UUID, 冷却截止时间UTC)
+        holders = {}
+        # 需要到数据库预占冷却期的组合：{(user_name, shop_name): 新任务UUID}
+        reservations = {}
+        # 新任务的写入数据：{任务UUID: 行数据}
+        new_rows = {}
+
+        for product in products:
+            key = (product.user_name, product.shop_name)
+            if key in holders or key in reservations:
+                continue
+
+            # 冷却期缓存命中时不参与数据库预占
+            cached = cached_cooldown(product.user_name, product.shop_name, now_utc)
+            if cached is not None:
+                holders[key] = cached
+                continue
+
+            task_uuid = new_task_uuid()
+            reservations[key] = task_uuid
+            new_rows[task_uuid] = {
+                "task_uuid": task_uuid,
+                "user_name": product.user_name,
+                "shop_name": product.shop_name,
+                "product_url": str(product.product_url),
+                "product_price": product.product_price,
+                "product_sku": product.product_sku,
+                "order_status": 1  # 进行中
+            }
+
+        # 一条批量 upsert + 一次分组查询完成全部冷却期预占
+        reserved = await reserve_cooldowns(db, reservations, now_utc)
+        holders.update(reserved)
+
+        accepted = [
+            new_rows[task_uuid]
+            for key, task_uuid in reservations.items()
+            if reserved[key][0] == task_uuid
+        ]
+
+        # 批量写入通过检查的任务，并取回自增ID和数据库写入的创建时间（统计日期按创建时间划分）
+        task_ids = {}
+        if accepted:
+            if db.bind.dialect.insert_executemany_returning:
+                result = await db.execute(
+                    insert(OrderTask).returning(OrderTask.id, OrderTask.task_uuid, OrderTask.created_at), accepted
+                )
+            else:
+                # MySQL 不支持 RETURNING，写入后按UUID一次查回
+                await db.execute(insert(OrderTask), accepted)
+                result = await db.execute(
+                    select(OrderTask.id, OrderTask.task_uuid, OrderTask.created_at).where(
+                        OrderTask.task_uuid.in_([row["task_uuid"] for row in accepted])
+                    )
+                )
+            inserted = result.all()
+            task_ids = {row.task_uuid: row.id for row in inserted}
+
+            shop_names = {row["task_uuid"]: row["shop_name"] for row in accepted}
+            await apply_stat_deltas(db, StatDeltas(
+                (stat_date(row.created_at), shop_names[row.task_uuid], 1) for row in inserted
+            ))
+
+        await db.commit()
+
+        for (user_name, shop_name), (holder_uuid, cooldown_until) in holders.items():
+            remember_cooldown(user_name, shop_name, holder_uuid, cooldown_until)
+        await replica_router.pin_users(row["user_name"] for row in accepted)
+        await current_task_cache.invalidate_users(row["user_name"] for row in accepted)
+        for row in accepted:
+            change_bus.publish(task_event(
+                "created", task_ids[row["task_uuid"]], row["task_uuid"], row["user_name"], row["shop_name"], 1
+            ))
+
+        # 按请求顺序生成逐条结果
+        results = []
+        created = set()
+        for product in products:
+            key = (product.user_name, product.shop_name)
+            holder_uuid, cooldown_until = holders[key]
+            if holder_uuid in task_ids and holder_uuid not in created:
+                created.add(holder_uuid)
+                results.append(ProductResponse(
+                    success=True,
+                    message="商品下单任务创建成功",
+                    task_id=task_ids[holder_uuid],
+                    task_uuid=holder_uuid
+                ))
+            else:
+                results.append(cooldown_rejection(
+                    product.user_name, product.shop_name, holder_uuid, cooldown_until, now_utc
+                ))
+
+        if len(products) > len(created):
+            COOLDOWN_REJECTIONS.inc("batch", amount=len(products) - len(created))
+
+        log_event(
+            logger, "orders_batch_created", submitted=len(products),
+            created=len(created), rejected=len(products) - len(created), outcome="created"
+        )
+
+        return BatchProductResponse(
+            success=True,
+            message=f"批量下单完成，创建 {len(created)} 个，拒绝 {len(products) - len(created)} 个",
+            created_count=len(created),
+            rejected_count=len(products) - len(created),
+            results=results
+        )
+
+    except PoolTimeoutError:
+        # 连接池已满，交给全局异常处理返回 503
+        raise
+    except Exception as e:
+        await db.rollback()
+        log_event(
+            logger, "orders_batch_create_failed", logging.ERROR,
+            submitted=len(products), outcome="error", error=str(e)
+        )
+        return BatchProductResponse(success=False, message=f"批量创建任务失败: {str(e)}")
+
+
+def encode_cursor(created_at: datetime, task_id: int) -> str:
+    """把上一页最后一条的 (created_at, id) 编码成不透明游标"""
+    raw = json.dumps([created_at.isoformat(), task_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """解析游标，格式错误时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, task_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(task_id)
+    except Exception as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+
+@app.get("/orders", response_model=OrderTaskListResponse)
+async def list_order_tasks(
+    user_name: Optional[str] = None,
+    shop_name: Optional[str] = None,
+    order_status: Optional[OrderStatusEnum] = None,
+    created_from: Optional[datetime] = Query(None, description="创建时间下限（包含）"),
+    created_to: Optional[datetime] = Query(None, description="创建时间上限（不包含）"),
+    limit: int = Query(50, ge=1, le=LIST_MAX_LIMIT, description="每页条数"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    include_total: bool = Query(False, description="是否返回估算总数（不执行 COUNT(*)）"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    查询下单任务列表
+
+    按创建时间倒序返回，使用游标（键集）分页：第 N 页与第 1 页的查询代价相同
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return model_response(OrderTaskListResponse(success=False, message=str(e)))
+
+    filters = dict(
+        user_name=user_name,
+        shop_name=shop_name,
+        order_status=int(order_status) if order_status is not None else None,
+        created_from=created_from,
+        created_to=created_to,
+    )
+
+    try:
+        # 多取一条用于判断是否还有下一页
+        result = await db.execute(task_list_query(**filters, after=after, limit=limit + 1))
+        rows = result.all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        approximate_total = None
+        if include_total:
+            approximate_total = await estimate_row_count(await db.connection(), task_list_query(**filters))
+
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+
+        return model_response(OrderTaskListResponse(
+            success=True,
+            message=f"查询到 {len(rows)} 个任务",
+            tasks=[OrderTaskDetail.model_validate(row) for row in rows],
+            total=len(rows),
+            next_cursor=next_cursor,
+            approximate_total=approximate_total
+        ))
+
+    except PoolTimeoutError:
+        # 连接池已满，交给全局异常处理返回 503
+        raise
+    except Exception as e:
+        log_event(logger, "order_list_failed", logging.ERROR, outcome="error", error=str(e))
+        return model_response(OrderTaskListResponse(success=False, message=f"查询任务列表失败: {str(e)}"))
+
+
+@app.get("/orders/stats", response_model=OrderTaskStatsResponse)
+async def get_order_stats(
+    shop_name: Optional[str] = None,
+    date_from: Optional[date] = Query(None, description="统计开始日期（UTC，包含）"),
+    date_to: Optional[date] = Query(None, description="统计结束日期（UTC，包含）"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    下单任务统计
+
+    读取按日汇总表，返回各状态的任务数，可按店铺和创建日期范围过滤
+    """
+    try:
+        stats = await query_stats(db, shop_name=shop_name, date_from=date_from, date_to=date_to)
+        return OrderTaskStatsResponse(success=True, message="获取任务统计成功", stats=stats)
+
+    except PoolTimeoutError:
+        # 连接池已满，交给全局异常处理返回 503
+        raise
+    except Exception as e:
+        log_event(logger, "order_stats_failed", logging.ERROR, shop_name=shop_name, outcome="error", error=str(e))
+        return OrderTaskStatsResponse(success=False, message=f"获取任务统计失败: {str(e)}", stats=OrderTaskStats())
+
+
+@app.get("/orders/export", response_class=StreamingResponse)
+async def export_order_tasks(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="导出格式：ndjson 或 csv"),
+    order_status: Optional[OrderStatusEnum] = None,
+    completed_from: Optional[datetime] = Query(None, description="完成时间下限（包含）"),
+    completed_to: Optional[datetime] = Query(None, description="完成时间上限（不包含）"),
+):
+    """
+    流式导出下单任务（财务对账）
+
+    使用服务端游标分批读取，边读边写，百万行导出也只占用一批行的内存
+    """
+    status = int(order_status) if order_status is not None else None
+    # 导出会话按 UTC 比较时间，带时区的参数先换算成 UTC
+    stmt = export_query(
+        order_status=status,
+        completed_from=to_naive_utc(completed_from) if completed_from is not None else None,
+        completed_to=to_naive_utc(completed_to) if completed_to is not None else None,
+    )
+    filename = f"order_tasks_{datetime.now(timezone.utc):%Y%m%d%H%M%S}.{format}"
+    log_event(logger, "order_export_started", format=format, order_status=status)
+    return StreamingResponse(
+        EXPORT_WRITERS[format](stmt),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@app.get("/users/{user_name}/orders/events", response_class=StreamingResponse)
+async def stream_user_order_events(user_name: str):
+    """
+    订阅用户的任务变更（Server-Sent Events）
+
+    该用户创建任务或任务被更新时推送一条事件，代替反复轮询当前任务接口
+    """
+    return StreamingResponse(sse_stream(user_topic(user_name)), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.get("/orders/{task_uuid}/events", response_class=StreamingResponse)
+async def stream_order_events(task_uuid: str):
+    """订阅单个任务的变更（Server-Sent Events）"""
+    canonical = canonical_task_uuid(task_uuid)
+    if canonical is None:
+        raise HTTPException(status_code=404, detail=f"任务UUID格式不正确: {task_uuid}")
+    return StreamingResponse(sse_stream(task_topic(canonical)), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.get("/orders/{task_uuid}/wait", response_model=TaskWaitResponse)
+async def wait_order_change(
+    task_uuid: str,
+    known_status: Optional[OrderStatusEnum] = Query(None, description="客户端已知的状态，当前状态与之不同时立即返回"),
+    timeout: float = Query(30, gt=0, le=LONG_POLL_MAX_TIMEOUT, description="最长等待秒数"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    长轮询等待任务变更
+
+    先订阅再查询当前状态，查询与订阅之间发生的变更也不会漏掉（当前状态必须读主库，
+    副本的复制延迟会让订阅前已发生的变更被漏掉）；等待期间不占用数据库连接。超时返回 changed=false，客户端直接发起下一次等待
+    """
+    raw_uuid, task_uuid = task_uuid, canonical_task_uuid(task_uuid)
+    if task_uuid is None:
+        return TaskWaitResponse(success=False, message=f"任务UUID格式不正确: {raw_uuid}")
+
+    with change_bus.subscribe(task_topic(task_uuid)) as queue:
+        try:
+            result = await db.execute(
+                select(
+                    OrderTask.id, OrderTask.task_uuid, OrderTask.user_name,
+                    OrderTask.shop_name, OrderTask.order_status
+                ).where(OrderTask.task_uuid == task_uuid)
+            )
+            task = result.first()
+        except PoolTimeoutError:
+            # 连接池已满，交给全局异常处理返回 503
+            raise
+        except Exception as e:
+            log_event(logger, "order_wait_failed", logging.ERROR, task_uuid=task_uuid, outcome="error", error=str(e))
+            return TaskWaitResponse(success=False, message=f"查询任务失败: {str(e)}")
+        finally:
+            # 释放连接，等待期间不占用连接池
+            await db.close()
+
+        if task is None:
+            return TaskWaitResponse(success=False, message=f"未找到任务UUID: {task_uuid}")
+
+        if known_status is not None and task.order_status != int(known_status):
+            event = task_event("current", task.id, task.task_uuid, task.user_name, task.shop_name, task.order_status)
+        else:
+            event = await next_event(queue, timeout)
+
+    if event is None:
+        return TaskWaitResponse(success=True, message="等待超时，任务没有变化", changed=False)
+    return TaskWaitResponse(
+        success=True, message="任务已变化", changed=True, event=TaskChangeEvent(**event)
+    )
+
+
+@app.get("/orders/{task_uuid}/pending", response_model=PendingUpdateResponse)
+async def get_pending_order_updates(task_uuid: str):
+    """
+    查询写入队列中尚未落库的更新
+
+    写入队列模式下 PATCH 返回时数据可能还未写入数据库，读取方可据此合并出最新状态
+    """
+    raw_uuid, task_uuid = task_uuid, canonical_task_uuid(task_uuid)
+    if task_uuid is None:
+        return PendingUpdateResponse(success=False, message=f"任务UUID格式不正确: {raw_uuid}")
+
+    pending = write_behind.pending_for(task_uuid)
+    fields = {}
+    for order_info in pending:
+        fields.update(order_info.model_dump(exclude_none=True))
+
+    return PendingUpdateResponse(
+        success=True,
+        message=f"有 {len(pending)} 个更新等待写入" if pending else "没有等待写入的更新",
+        task_uuid=task_uuid,
+        pending_count=len(pending),
+        fields=fields
+    )
 
 
 @app.patch("/orders/{task_uuid}", response_model=ProductResponse)
-async def update_order_info(task_uuid: str, order_info: UpdateOrderInfoRequest, db: Session = Depends(get_db)):
+async def update_order_info(
+    task_uuid: str,
+    order_info: UpdateOrderInfoRequest,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: Optional[str] = IDEMPOTENCY_KEY_HEADER
+):
     """
     更新订单信息
 
     根据task_uuid更新订单的详细信息，包括订单号、支付宝交易号、收货信息等
+    带 Idempotency-Key 请求头时，同一个键的重试直接返回首次成功的响应
     """
+    return await idempotent(
+        db, idempotency_key, f"PATCH /orders/{canonical_task_uuid(task_uuid) or task_uuid}", order_info,
+        lambda request: update_order(task_uuid, order_info, db, request)
+    )
+
+async def update_order(task_uuid: str, order_info: UpdateOrderInfoRequest, db: AsyncSession,
+                       idempotent_request: Optional[IdempotentRequest]) -> Response:
+    """更新订单信息；带幂等键时成功响应与更新在同一事务中保存"""
+    raw_uuid, task_uuid = task_uuid, canonical_task_uuid(task_uuid)
+    if task_uuid is None:
+        return model_response(ProductResponse(success=False, message=f"任务UUID格式不正确: {raw_uuid}"))
+
+    if WRITE_BEHIND_ENABLED:
+        # 写入队列模式：日志落盘后即返回，由后台任务合并写库（不存在的任务在落库时忽略）
+        try:
+            await write_behind.enqueue(task_uuid, order_info)
+        except Exception as e:
+            log_event(logger, "order_update_failed", logging.ERROR, task_uuid=task_uuid, outcome="error", error=str(e))
+            return model_response(ProductResponse(success=False, message=f"更新订单信息失败: {str(e)}"))
+
+        log_event(logger, "order_update_queued", task_uuid=task_uuid, outcome="queued")
+        response = ProductResponse(
+            success=True,
+            message=f"订单信息更新已受理，将在 {WRITE_BEHIND_WINDOW:g} 秒内写入",
+            task_uuid=task_uuid
+        )
+        if idempotent_request is not None:
+            # 更新已写入队列日志，响应单独提交；保存失败只影响重试去重（重复入队的更新内容相同）
+            try:
+                await idempotent_request.save(db, response)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                log_event(
+                    logger, "idempotency_save_failed", logging.WARNING, task_uuid=task_uuid, error=str(e)
+                )
+        return model_response(response)
+
     try:
-        # 根据task_uuid查询任务
-        task = db.query(OrderTask).filter(OrderTask.task_uuid == task_uuid).first()
+        # 更新字段（只更新提供的非空字段，并根据提供的信息判断订单状态）
+        values, updated_fields = build_update_values(order_info)
 
-        if not task:
-            print(f"❌ 未找到任务: {task_uuid}")
-            return ProductResponse(
+        # 一条 UPDATE 完成更新，通过影响行数判断任务是否存在
+        task_id = await update_task(db, task_uuid, values)
+
+        if task_id is None:
+            await db.rollback()
+            log_event(logger, "order_update_not_found", task_uuid=task_uuid, outcome="not_found")
+            return model_response(ProductResponse(
                 success=False,
                 message=f"未找到任务UUID: {task_uuid}"
-            )
+            ))
 
-        # 更新字段（只更新提供的非空字段）
-        updated_fields = []
-
-        if order_info.order_id is not None:
-            task.order_id = order_info.order_id
-            updated_fields.append(f"订单号: {order_info.order_id}")
-
-        if order_info.alipay_trade_no is not None:
-            task.alipay_trade_no = order_info.alipay_trade_no
-            updated_fields.append(f"支付宝交易号: {order_info.alipay_trade_no}")
-
-        if order_info.receiver_name is not None:
-            task.receiver_name = order_info.receiver_name
-            updated_fields.append(f"收货人: {order_info.receiver_name}")
-
-        if order_info.receiver_address is not None:
-            task.receiver_address = order_info.receiver_address
-            updated_fields.append(f"收货地址: {order_info.receiver_address}")
-
-        if order_info.receiver_phone is not None:
-            task.receiver_phone = order_info.receiver_phone
-            updated_fields.append(f"收货电话: {order_info.receiver_phone}")
-
-        # 智能判断订单状态
-        if order_info.order_status is not None:
-            # 用户明确指定了状态
-            if order_info.order_status == 2:  # 完成
-                task.order_status = 2
-                task.completed_at = func.now()
-            elif order_info.order_status == 3:  # 失败
-                task.order_status = 3
-            elif order_info.order_status == 1:  # 进行中
-                task.order_status = 1
-            updated_fields.append(f"订单状态: {order_info.order_status}")
-        else:
-            # 用户没有指定状态，根据提供的信息智能判断
-            if (order_info.order_id is not None and
-                order_info.alipay_trade_no is not None and
-                order_info.receiver_name is not None):
-                # 如果提供了订单号、支付宝交易号和收货人信息，自动设置为完成
-                task.order_status = 2  # 完成
-                task.completed_at = func.now()
-                updated_fields.append("订单状态: 2 (完成-自动设置)")
-
-        if order_info.error_message is not None:
-            task.error_message = order_info.error_message
-            updated_fields.append(f"错误信息: {order_info.error_message}")
+        response = ProductResponse(
+            success=True,
+            message=f"订单信息更新成功，共更新 {len(updated_fields)} 个字段",
+            task_id=task_id,
+            task_uuid=task_uuid
+        )
+        if idempotent_request is not None:
+            await idempotent_request.save(db, response)
 
         # 保存更改
-        db.commit()
-        db.refresh(task)
+        await db.commit()
+        await pin_task_owners(db, [task_uuid])
+        await invalidate_updated_tasks(db, [task_uuid], [task_uuid] if "order_status" in values else [])
+        await publish_task_updates(db, [task_uuid])
+
+        log_event(
+            logger, "order_updated", task_id=task_id, task_uuid=task_uuid,
+            fields=sorted(values), order_status=values.get("order_status"), outcome="updated"
+        )
+
+        return model_response(response)
 
-        print(f"✅ 更新订单信息成功:")
-        print(f"  任务UUID: {task.task_uuid}")
-        for field in updated_fields:
-            print(f"  {field}")
+    except PoolTimeoutError:
+        # 连接池已满，交给全局异常处理返回 503
+        raise
+    except Exception as e:
+        await db.rollback()
+        log_event(logger, "order_update_failed", logging.ERROR, task_uuid=task_uuid, outcome="error", error=str(e))
+        return model_response(ProductResponse(success=False, message=f"更新订单信息失败: {str(e)}"))
+
+
+@app.patch("/orders", response_model=BulkUpdateOrderResponse)
+async def bulk_update_order_info(items: List[BulkUpdateOrderItem], db: AsyncSession = Depends(get_async_db)):
+    """
+    批量更新订单信息
 
-        return ProductResponse(
+    与单条更新使用相同的字段和状态规则，results 与请求列表按顺序一一对应
+    更新列相同的任务合并为一条批量 UPDATE，全部更新在同一事务中提交
+    """
+    if not items:
+        return BulkUpdateOrderResponse(success=False, message="更新列表不能为空")
+    if len(items) > BATCH_MAX_SIZE:
+        return BulkUpdateOrderResponse(
+            success=False,
+            message=f"单次最多提交 {BATCH_MAX_SIZE} 个更新，当前 {len(items)} 个"
+        )
+
+    # UUID 统一为规范格式后再查询，格式非法的直接计入未找到
+    keys = [canonical_task_uuid(item.task_uuid) for item in items]
+
+    try:
+        if WRITE_BEHIND_ENABLED:
+            # 先落库写入队列中更早到达的单条更新，保证更新的先后顺序
+            await write_behind.flush()
+
+        updated = await bulk_update_tasks(db, [(key, item) for key, item in zip(keys, items) if key is not None])
+        await db.commit()
+        await pin_task_owners(db, list(updated))
+        await invalidate_updated_tasks(db, list(updated), [
+            key for key, item in zip(keys, items) if key in updated and changes_status(item)
+        ])
+        await publish_task_updates(db, list(updated))
+
+        results = []
+        not_found = []
+        for key, item in zip(keys, items):
+            if key in updated:
+                task_id, updated_fields = updated[key]
+                results.append(ProductResponse(
+                    success=True,
+                    message=f"订单信息更新成功，共更新 {len(updated_fields)} 个字段",
+                    task_id=task_id,
+                    task_uuid=key
+                ))
+            else:
+                if item.task_uuid not in not_found:
+                    not_found.append(item.task_uuid)
+                results.append(ProductResponse(
+                    success=False,
+                    message=f"未找到任务UUID: {item.task_uuid}",
+                    task_uuid=item.task_uuid
+                ))
+
+        log_event(
+            logger, "orders_bulk_updated", submitted=len(items), updated=len(updated),
+            not_found=len(not_found), outcome="updated"
+        )
+
+        return BulkUpdateOrderResponse(
             success=True,
-            message=f"订单信息更新成功，共更新 {len(updated_fields)} 个字段",
-            task_id=task.id,
-            task_uuid=task.task_uuid
+            message=f"批量更新完成，更新 {len(updated)} 个任务，未找到 {len(not_found)} 个",
+            updated_count=len(updated),
+            not_found=not_found,
+            results=results
+        )
+
+    except PoolTimeoutError:
+        # 连接池已满，交给全局异常处理返回 503
+        raise
+    except Exception as e:
+        await db.rollback()
+        log_event(
+            logger, "orders_bulk_update_failed", logging.ERROR,
+            submitted=len(items), outcome="error", error=str(e)
+        )
+        return BulkUpdateOrderResponse(success=False, message=f"批量更新订单信息失败: {str(e)}")
+
+
+def lease_seconds_error(lease_seconds: int) -> Optional[str]:
+    """租约秒数超出上限时返回错误信息"""
+    if lease_seconds > TASK_LEASE_MAX_SECONDS:
+        return f"租约最长 {TASK_LEASE_MAX_SECONDS} 秒，当前 {lease_seconds} 秒"
+    return None
+
+
+@app.post("/tasks/claim", response_model=ClaimTasksResponse)
+async def claim_order_tasks(claim: ClaimTasksRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    领取待处理的下单任务（工作队列）
+
+    从所有进行中、未被领取或租约已到期的任务中按先后顺序原子地领取最多 limit 个，
+    记录领取者和租约到期时间。多个 worker 并发领取时跳过彼此锁定的行，同一任务不会同时发给两个 worker。
+    处理完成后照常通过 PATCH /orders/{task_uuid} 更新状态；处理时间可能超过租约时调用续约接口
+    """
+    if claim.limit > CLAIM_MAX_SIZE:
+        return model_response(ClaimTasksResponse(
+            success=False,
+            message=f"单次最多领取 {CLAIM_MAX_SIZE} 个任务，当前 {claim.limit} 个"
+        ))
+    lease_seconds = claim.lease_seconds or TASK_LEASE_SECONDS
+    error = lease_seconds_error(lease_seconds)
+    if error:
+        return model_response(ClaimTasksResponse(success=False, message=error))
+
+    try:
+        rows, requeued = await claim_tasks(db, claim.worker_id, claim.limit, lease_seconds)
+        await db.commit()
+
+    except PoolTimeoutError:
+        # 连接池已满，交给全局异常处理返回 503
+        raise
+    except Exception as e:
+        await db.rollback()
+        log_event(
+            logger, "tasks_claim_failed", logging.ERROR, worker_id=claim.worker_id, outcome="error", error=str(e)
+        )
+        return model_response(ClaimTasksResponse(success=False, message=f"领取任务失败: {str(e)}"))
+
+    if rows:
+        TASKS_CLAIMED.inc("new", amount=len(rows) - requeued)
+        if requeued:
+            TASKS_CLAIMED.inc("expired", amount=requeued)
+    log_event(
+        logger, "tasks_claimed", worker_id=claim.worker_id, requested=claim.limit, claimed=len(rows),
+        requeued=requeued, outcome="claimed" if rows else "empty"
+    )
+
+    return model_response(ClaimTasksResponse(
+        success=True,
+        message=f"领取到 {len(rows)} 个任务" if rows else "当前没有可领取的任务",
+        lease_expires_at=rows[0].lease_expires_at if rows else None,
+        tasks=[OrderTaskDetail.model_validate(row) for row in rows]
+    ))
+
+
+@app.post("/tasks/{task_uuid}/renew", response_model=TaskLeaseResponse)
+async def renew_task_lease(task_uuid: str, lease: TaskLeaseRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    续约已领取的任务
+
+    租约从当前时间起再延长 lease_seconds 秒；任务已结束或已被其他 worker 领取时返回失败，
+    worker 应停止处理该任务
+    """
+    raw_uuid, task_uuid = task_uuid, canonical_task_uuid(task_uuid)
+    if task_uuid is None:
+        return model_response(TaskLeaseResponse(success=False, message=f"任务UUID格式不正确: {raw_uuid}"))
+    lease_seconds = lease.lease_seconds or TASK_LEASE_SECONDS
+    error = lease_seconds_error(lease_seconds)
+    if error:
+        return model_response(TaskLeaseResponse(success=False, message=error, task_uuid=task_uuid))
+
+    try:
+        renewed = await renew_lease(db, task_uuid, lease.worker_id, lease_seconds)
+        await db.commit()
+
+    except PoolTimeoutError:
+        # 连接池已满，交给全局异常处理返回 503
+        raise
+    except Exception as e:
+        await db.rollback()
+        log_event(
+            logger, "task_lease_renew_failed", logging.ERROR, task_uuid=task_uuid,
+            worker_id=lease.worker_id, outcome="error", error=str(e)
         )
+        return model_response(TaskLeaseResponse(success=False, message=f"续约失败: {str(e)}", task_uuid=task_uuid))
+
+    if renewed is None:
+        log_event(logger, "task_lease_lost", task_uuid=task_uuid, worker_id=lease.worker_id, outcome="lost")
+        return model_response(TaskLeaseResponse(
+            success=False,
+            message=f"任务 {task_uuid} 不存在、已结束或已被其他 worker 领取",
+            task_uuid=task_uuid
+        ))
+
+    log_event(
+        logger, "task_lease_renewed", task_id=renewed.id, task_uuid=task_uuid,
+        worker_id=lease.worker_id, lease_seconds=lease_seconds, outcome="renewed"
+    )
+    return model_response(TaskLeaseResponse(
+        success=True,
+        message=f"续约成功，租约延长 {lease_seconds} 秒",
+        task_uuid=task_uuid,
+        lease_expires_at=renewed.lease_expires_at
+    ))
+
+
+@app.post("/tasks/{task_uuid}/release", response_model=TaskLeaseResponse)
+async def release_task_lease(task_uuid: str, lease: TaskLeaseRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    归还已领取但不再处理的任务
+
+    worker 退出或放弃处理时调用，任务立即可以被其他 worker 领取，不用等租约到期
+    """
+    raw_uuid, task_uuid = task_uuid, canonical_task_uuid(task_uuid)
+    if task_uuid is None:
+        return model_response(TaskLeaseResponse(success=False, message=f"任务UUID格式不正确: {raw_uuid}"))
+
+    try:
+        released = await release_lease(db, task_uuid, lease.worker_id)
+        await db.commit()
 
+    except PoolTimeoutError:
+        # 连接池已满，交给全局异常处理返回 503
+        raise
     except Exception as e:
-        db.rollback()
-        print(f"❌ 更新订单信息失败: {str(e)}")
-        return ProductResponse(success=False, message=f"更新订单信息失败: {str(e)}")
+        await db.rollback()
+        log_event(
+            logger, "task_lease_release_failed", logging.ERROR, task_uuid=task_uuid,
+            worker_id=lease.worker_id, outcome="error", error=str(e)
+        )
+        return model_response(TaskLeaseResponse(success=False, message=f"归还任务失败: {str(e)}", task_uuid=task_uuid))
+
+    log_event(
+        logger, "task_lease_released", task_uuid=task_uuid, worker_id=lease.worker_id,
+        outcome="released" if released else "not_held"
+    )
+    if not released:
+        return model_response(TaskLeaseResponse(
+            success=False,
+            message=f"任务 {task_uuid} 不存在、已结束或不由该 worker 持有",
+            task_uuid=task_uuid
+        ))
+    return model_response(TaskLeaseResponse(success=True, message="任务已归还", task_uuid=task_uuid))
 
 
 @app.get("/users/{user_name}/orders/current", response_model=CurrentTaskResponse)
-async def get_user_current_order(user_name: str, db: Session = Depends(get_db)):
+async def get_user_current_order(user_name: str, db: AsyncSession = Depends(get_read_db)):
     """
     获取用户当前进行中的订单
 
     根据用户名查询当前状态为"进行中"(order_status=1)的订单
     返回订单的完整信息，包括任务ID、UUID、店铺名称、商品链接、价格、SKU等
+    结果按用户缓存，创建任务或更新任务后失效
     """
+    cached = await current_task_cache.get(user_name)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
     try:
+        generation = await current_task_cache.generation(user_name)
+
         # 查询该用户当前进行中的任务（按创建时间倒序，取最新的一条）
-        current_task = db.query(OrderTask).filter(
-            OrderTask.user_name == user_name,
-            OrderTask.order_status == 1  # 1 = 进行中
-        ).order_by(OrderTask.created_at.desc()).first()
+        result = await db.execute(current_task_query(user_name))
+        current_task = result.first()
 
         if not current_task:
-            print(f"❌ 用户 '{user_name}' 当前没有进行中的任务")
-            return CurrentTaskResponse(
+            log_event(logger, "current_order_fetched", user_name=user_name, outcome="none")
+            response = CurrentTaskResponse(
                 success=False,
                 message=f"用户 '{user_name}' 当前没有进行中的任务",
                 task=None
             )
+        else:
+            # 转换为响应模型
+            task_detail = OrderTaskDetail.model_validate(current_task)
 
-        # 转换为响应模型
-        task_detail = OrderTaskDetail.model_validate(current_task)
+            log_event(
+                logger, "current_order_fetched", task_id=current_task.id, task_uuid=current_task.task_uuid,
+                user_name=user_name, shop_name=current_task.shop_name, outcome="found"
+            )
 
-        print(f"✅ 获取用户当前任务成功:")
-        print(f"  用户名: {current_task.user_name}")
-        print(f"  任务ID: {current_task.id}")
-        print(f"  任务UUID: {current_task.task_uuid}")
-        print(f"  店铺名称: {current_task.shop_name}")
-        print(f"  商品链接: {current_task.product_url}")
-        print(f"  商品价格: {current_task.product_price}")
-        print(f"  商品SKU: {current_task.product_sku}")
+            response = CurrentTaskResponse(
+                success=True,
+                message=f"成功获取用户 '{user_name}' 的当前进行中任务",
+                task=task_detail
+            )
 
-        return CurrentTaskResponse(
-            success=True,
-            message=f"成功获取用户 '{user_name}' 的当前进行中任务",
-            task=task_detail
+        # 缓存序列化后的响应，命中时直接返回字节串，跳过查询和序列化
+        payload = response.model_dump_json().encode("utf-8")
+        await current_task_cache.store(
+            user_name, generation, payload, current_task.task_uuid if current_task else None
         )
+        return Response(content=payload, media_type="application/json")
 
+    except PoolTimeoutError:
+        # 连接池已满，交给全局异常处理返回 503
+        raise
     except Exception as e:
-        print(f"❌ 获取用户当前任务失败: {str(e)}")
-        return CurrentTaskResponse(
+        log_event(logger, "current_order_fetch_failed", logging.ERROR, user_name=user_name, outcome="error", error=str(e))
+        return model_response(CurrentTaskResponse(
             success=False,
             message=f"获取用户当前任务失败: {str(e)}",
             task=None
-        )
+        ))
 
 
 if __name__ == "__main__":
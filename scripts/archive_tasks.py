@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+下单任务归档脚本
+把创建时间早于保留期的已完成 / 失败任务从 order_tasks 迁移到 order_tasks_archive，然后删除已清空的月份分区
+
+1. 补齐未来月份的分区（MySQL）
+2. 按主键分块迁移：每块在一个短事务内锁定、复制到归档表、从任务表删除，块之间可以休眠以减轻主库压力
+3. 上界早于保留期、且已没有任何行的月份分区直接 DROP PARTITION（只修改元数据，不逐行删除）；
+   仍有进行中任务的旧分区保留，并输出剩余行数
+4. 分块删除已过期的幂等键（idempotency_keys）和冷却期已过的冷却记录（order_cooldowns）
+
+建议每天低峰期由定时任务执行一次
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from sqlalchemy import and_, delete, func, insert, literal_column, or_, select, text, tuple_
+
+from src.database import engine, IdempotencyKey, OrderCooldown, OrderStatus, OrderTask, OrderTaskArchive
+from src.partitions import (
+    PARTITION_AHEAD_MONTHS, drop_partition, ensure_future_partitions, list_partitions, partition_row_count,
+)
+
+# 可以归档的终态
+ARCHIVABLE_STATUSES = (OrderStatus.COMPLETED.value, OrderStatus.FAILED.value)
+# 归档表与任务表共有的列（租约列只在任务表上）
+TASK_COLUMNS = [column.name for column in OrderTaskArchive.__table__.columns if column.name != "archived_at"]
+SOURCE_COLUMNS = [OrderTask.__table__.c[name] for name in TASK_COLUMNS]
+
+
+def archivable(cutoff):
+    return (OrderTask.created_at < cutoff) & OrderTask.order_status.in_(ARCHIVABLE_STATUSES)
+
+
+def count_archivable(conn, cutoff):
+    return conn.execute(select(func.count()).select_from(OrderTask).where(archivable(cutoff))).scalar()
+
+
+def move_chunk(conn, cutoff, after_id, chunk_size):
+    """
+    在一个事务内迁移 ID 大于 after_id 的下一块任务，返回迁移的 ID 列表
+
+    先 FOR UPDATE 锁定本块的行，避免复制和删除之间任务被重新打开
+    """
+    with conn.begin():
+        locking = select(OrderTask.id).where(archivable(cutoff), OrderTask.id > after_id) \
+            .order_by(OrderTask.id).limit(chunk_size)
+        if conn.dialect.name == "mysql":
+            locking = locking.with_for_update()
+        ids = conn.execute(locking).scalars().all()
+        if not ids:
+            return []
+        conn.execute(
+            insert(OrderTaskArchive).from_select(
+                [*TASK_COLUMNS, "archived_at"],
+                select(*SOURCE_COLUMNS, literal_column("CURRENT_TIMESTAMP")).where(OrderTask.id.in_(ids)),
+            )
+        )
+        conn.execute(delete(OrderTask).where(OrderTask.id.in_(ids)))
+    return ids
+
+
+def archive_rows(conn, cutoff, chunk_size, sleep_seconds):
+    moved = 0
+    after_id = 0
+    while ids := move_chunk(conn, cutoff, after_id, chunk_size):
+        moved += len(ids)
+        after_id = ids[-1]
+        print(f"  已归档 {moved} 个任务（ID ≤ {after_id}）")
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+    return moved
+
+
+def expired_partitions(conn, cutoff):
+    """上界不晚于保留期起点的月份分区（其中所有行都早于保留期）"""
+    bound = int(cutoff.timestamp())
+    return [name for name, upper in list_partitions(conn) if upper is not None and upper <= bound]
+
+
+def drop_empty_partitions(conn, cutoff, dry_run):
+    dropped = []
+    for name in expired_partitions(conn, cutoff):
+        remaining = partition_row_count(conn, name)
+        if remaining:
+            print(f"  ⏭️  分区 {name} 仍有 {remaining} 个未结束的任务，保留")
+            continue
+        if not dry_run:
+            drop_partition(conn, name)
+        dropped.append(name)
+        print(f"  🗑️  {'将删除' if dry_run else '已删除'}空分区 {name}")
+    return dropped
+
+
+def purge_idempotency_keys(conn, chunk_size, sleep_seconds):
+    """分块删除已过期的幂等键（按 idx_idempotency_expires 查找），返回删除的条数"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    purged = 0
+    while True:
+        with conn.begin():
+            keys = conn.execute(
+                select(IdempotencyKey.idempotency_key).where(IdempotencyKey.expires_at <= now).limit(chunk_size)
+            ).scalars().all()
+            if not keys:
+                return purged
+            conn.execute(delete(IdempotencyKey).where(IdempotencyKey.idempotency_key.in_(keys)))
+        purged += len(keys)
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+
+def purge_expired_cooldowns(conn, chunk_size, sleep_seconds):
+    """
+    分块删除冷却期已过的冷却记录，返回删除的条数
+
+    过期记录与不存在的记录对下单等价（预占时会被直接覆盖），但每个用户×店铺会永久留下一行。
+    冷却表没有 cooldown_until 索引，按主键顺序分块扫描；删除时再确认一次已过期，
+    不会删掉扫描之后被新订单续上的冷却期
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    key = tuple_(OrderCooldown.user_name, OrderCooldown.shop_name)
+    after = None
+    purged = 0
+    while True:
+        with conn.begin():
+            stmt = select(OrderCooldown.user_name, OrderCooldown.shop_name, OrderCooldown.cooldown_until)
+            if after is not None:
+                # 展开成 OR 形式，MySQL 对行构造器比较的范围优化不稳定
+                stmt = stmt.where(or_(
+                    OrderCooldown.user_name > after[0],
+                    and_(OrderCooldown.user_name == after[0], OrderCooldown.shop_name > after[1]),
+                ))
+            rows = conn.execute(
+                stmt.order_by(OrderCooldown.user_name, OrderCooldown.shop_name).limit(chunk_size)
+            ).all()
+            if not rows:
+                return purged
+            expired = [(row.user_name, row.shop_name) for row in rows if row.cooldown_until <= now]
+            if expired:
+                result = conn.execute(
+                    delete(OrderCooldown).where(key.in_(expired), OrderCooldown.cooldown_until <= now)
+                )
+                purged += result.rowcount
+        after = (rows[-1].user_name, rows[-1].shop_name)
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="归档已结束的历史下单任务")
+    parser.add_argument("-d", "--days", type=int, default=int(os.getenv("ARCHIVE_AFTER_DAYS", "180")),
+                        help="保留最近多少天创建的任务，更早的已完成 / 失败任务会被归档")
+    parser.add_argument("-c", "--chunk-size", type=int, default=1000, help="每个事务迁移的任务数")
+    parser.add_argument("-s", "--sleep", type=float, default=0.1, help="每个分块之间的休眠秒数")
+    parser.add_argument("--ahead", type=int, default=PARTITION_AHEAD_MONTHS, help="提前创建的未来月份分区数")
+    parser.add_argument("--dry-run", action="store_true", help="只统计待归档的任务和可删除的分区，不做修改")
+    args = parser.parse_args()
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=args.days)
+    print(f"📦 归档 {cutoff:%Y-%m-%d %H:%M} (UTC) 之前创建的已完成 / 失败任务...")
+
+    with engine.connect() as conn:
+        partitioned = conn.dialect.name == "mysql"
+        if partitioned:
+            # TIMESTAMP 按会话时区比较，切到 UTC 与保留期起点的口径一致
+            conn.execute(text("SET time_zone = '+00:00'"))
+        else:
+            print("ℹ️  非 MySQL 数据库，只迁移任务，不管理分区")
+
+        if args.dry_run:
+            print(f"🔍 待归档任务 {count_archivable(conn, cutoff)} 个")
+            conn.rollback()
+            if partitioned:
+                drop_empty_partitions(conn, cutoff, dry_run=True)
+            return
+
+        if partitioned:
+            added = ensure_future_partitions(conn, args.ahead)
+            conn.commit()
+            if added:
+                print(f"🧱 新建分区: {', '.join(added)}")
+
+        moved = archive_rows(conn, cutoff, args.chunk_size, args.sleep)
+        dropped = drop_empty_partitions(conn, cutoff, dry_run=False) if partitioned else []
+        conn.commit()
+        purged = purge_idempotency_keys(conn, args.chunk_size, args.sleep)
+        cooldowns = purge_expired_cooldowns(conn, args.chunk_size, args.sleep)
+
+    print(f"✅ 归档完成，迁移 {moved} 个任务，删除 {len(dropped)} 个空分区，"
+          f"清理 {purged} 个过期幂等键、{cooldowns} 条过期冷却记录")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+热点查询执行计划检查脚本
+打印 API 热点查询的 EXPLAIN 结果，发现全表扫描 / index_merge / filesort 时返回非零退出码
+"""
+
+import os
+import sys
+import argparse
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from src.database import engine
+from src.queries import claimable_tasks_query, cooldown_query, current_task_query, task_list_query, to_driver_sql
+
+def hot_queries(user_name, shop_name):
+    """需要检查的热点查询：(名称, 查询语句, 可接受的索引名)"""
+    return [
+        # order_cooldowns 以 (user_name, shop_name) 为主键，SQLite 中表现为自动索引
+        ("24小时冷却检查", cooldown_query(user_name, shop_name),
+         ("PRIMARY", "sqlite_autoindex_order_cooldowns_1")),
+        ("用户当前任务", current_task_query(user_name), ("idx_user_status_created",)),
+        ("领取任务", claimable_tasks_query(10), ("idx_status_lease",)),
+        # 任务列表首页（键集分页的后续页只多一个 created_at 范围条件，走同一个索引）
+        ("任务列表", task_list_query(limit=51), ("idx_created_id",)),
+        ("店铺任务列表", task_list_query(shop_name=shop_name, limit=51), ("idx_shop_created_id",)),
+        ("用户任务列表", task_list_query(user_name=user_name, limit=51), ("idx_user_created_id",)),
+    ]
+
+def explain(conn, stmt):
+    """执行 EXPLAIN 并返回 (列名, 行列表)"""
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    sql, params = to_driver_sql(stmt, conn.dialect)
+    result = conn.exec_driver_sql(prefix + sql, params)
+    return list(result.keys()), [dict(row._mapping) for row in result]
+
+def find_problems(dialect_name, rows, expected_indexes):
+    """根据执行计划找出回退问题"""
+    problems = []
+    for row in rows:
+        if dialect_name == "sqlite":
+            detail = str(row.get("detail", ""))
+            if detail.startswith("SCAN") and "INDEX" not in detail:
+                problems.append(f"全表扫描: {detail}")
+            if "TEMP B-TREE" in detail:
+                problems.append(f"额外排序: {detail}")
+            if detail.startswith("SEARCH") and not any(name in detail for name in expected_indexes):
+                problems.append(f"未使用 {'/'.join(expected_indexes)}: {detail}")
+        else:
+            access_type = row.get("type")
+            extra = row.get("Extra") or ""
+            if access_type == "ALL":
+                problems.append("全表扫描 (type=ALL)")
+            if access_type == "index_merge":
+                problems.append("index_merge 扫描")
+            if "filesort" in extra:
+                problems.append(f"filesort: {extra}")
+            if row.get("key") not in expected_indexes:
+                problems.append(f"使用的索引为 {row.get('key')}，期望 {'/'.join(expected_indexes)}")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="热点查询执行计划检查")
+    parser.add_argument("-u", "--user-name", default="测试用户1", help="查询使用的用户名")
+    parser.add_argument("-s", "--shop-name", default="测试店铺1", help="查询使用的店铺名")
+    args = parser.parse_args()
+
+    failed = False
+    with engine.connect() as conn:
+        for name, stmt, expected_indexes in hot_queries(args.user_name, args.shop_name):
+            columns, rows = explain(conn, stmt)
+            print(f"🔍 {name}")
+            print("  " + " | ".join(columns))
+            for row in rows:
+                print("  " + " | ".join(str(row[column]) for column in columns))
+
+            problems = find_problems(conn.dialect.name, rows, expected_indexes)
+            if problems:
+                failed = True
+                for problem in problems:
+                    print(f"  ❌ {problem}")
+            else:
+                print(f"  ✅ 命中 {'/'.join(expected_indexes)}")
+            print()
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
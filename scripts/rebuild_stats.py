@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+统计汇总表重建脚本
+按主键分块扫描 order_tasks 和归档表 order_tasks_archive，重新计算 order_task_daily_stats，用于首次上线回填和修正偏差
+
+每个分块是一次短查询，块之间可以休眠以减轻主库压力；扫描结束后在一个事务内替换汇总数据。
+扫描期间新创建 / 变更状态的任务可能造成少量偏差，建议在低峰期执行
+"""
+
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+from datetime import date
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from sqlalchemy import delete, func, insert, select, text
+
+from src.database import engine, OrderTask, OrderTaskArchive, OrderTaskDailyStat
+
+def scan_counts(conn, model, chunk_size, sleep_seconds):
+    """分块统计 (创建日期, 店铺, 状态) -> 任务数"""
+    totals = Counter()
+    max_id = conn.execute(select(func.max(model.id))).scalar() or 0
+    day = func.date(model.created_at)
+
+    for start in range(0, max_id + 1, chunk_size):
+        rows = conn.execute(
+            select(day, model.shop_name, model.order_status, func.count())
+            .where(model.id >= start, model.id < start + chunk_size)
+            .group_by(day, model.shop_name, model.order_status)
+        ).all()
+        for stat_day, shop_name, order_status, count in rows:
+            if isinstance(stat_day, str):
+                stat_day = date.fromisoformat(stat_day)
+            totals[(stat_day, shop_name, order_status)] += count
+
+        print(f"  {model.__tablename__} 已扫描 ID {start} ~ {min(start + chunk_size, max_id + 1) - 1} / {max_id}")
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    return totals
+
+def write_counts(conn, totals, batch_size):
+    """在一个事务内清空并写入汇总数据"""
+    rows = [
+        {"stat_date": stat_day, "shop_name": shop_name, "order_status": order_status, "task_count": count}
+        for (stat_day, shop_name, order_status), count in sorted(totals.items())
+    ]
+    with conn.begin():
+        conn.execute(delete(OrderTaskDailyStat))
+        for start in range(0, len(rows), batch_size):
+            conn.execute(insert(OrderTaskDailyStat), rows[start:start + batch_size])
+    return len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="重建下单任务统计汇总表")
+    parser.add_argument("-c", "--chunk-size", type=int, default=10000, help="每次扫描的ID范围")
+    parser.add_argument("-s", "--sleep", type=float, default=0.05, help="每个分块之间的休眠秒数")
+    parser.add_argument("-b", "--batch-size", type=int, default=1000, help="每次写入汇总表的行数")
+    args = parser.parse_args()
+
+    print("🔄 开始重建统计汇总表...")
+    with engine.connect() as conn:
+        if conn.dialect.name == "mysql":
+            # TIMESTAMP 按会话时区显示，切到 UTC 后 DATE(created_at) 与接口的统计日期口径一致
+            conn.execute(text("SET time_zone = '+00:00'"))
+        # 归档的任务仍计入统计
+        totals = Counter()
+        for model in (OrderTask, OrderTaskArchive):
+            totals += scan_counts(conn, model, args.chunk_size, args.sleep)
+        conn.rollback()
+        written = write_counts(conn, totals, args.batch_size)
+
+    print(f"✅ 统计汇总表重建完成，共 {written} 行，任务总数 {sum(totals.values())}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+进程内缓存
+
+有容量上限的 LRU + TTL 缓存，用于挡住重复请求对数据库的访问。
+所有操作都在事件循环线程内完成，不需要加锁
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from src.logger import get_logger, log_event
+
+logger = get_logger("ordertracker.cache")
+
+
+class TTLCache:
+    """有容量上限、按过期时间淘汰的 LRU 缓存"""
+
+    def __init__(self, max_size: int, default_ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """读取缓存；不存在或已过期时返回 None 并计入未命中"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存，ttl 为存活秒数（未指定时使用 default_ttl）"""
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl is None or ttl <= 0 or self.max_size <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        """删除缓存项"""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """缓存统计信息"""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class LocalBackend:
+    """进程内存储（默认），每个 worker 进程各自一份"""
+
+    def __init__(self, max_size: int):
+        self._cache = TTLCache(max_size=max_size)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.delete(key)
+
+
+class RedisBackend:
+    """
+    Redis 共享存储，多 worker / 多实例部署时所有进程共用一份缓存（需要安装 redis 包）
+
+    Redis 不可用时读按未命中处理、写和删除跳过并记录日志，不影响接口本身
+    """
+
+    def __init__(self, url: str, prefix: str = "ordertracker:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_URL 指定了 Redis，但未安装 redis 包：pip install redis") from e
+        self._client = redis.from_url(url)
+        self._errors = redis.RedisError
+        self._prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self._client.get(self._prefix + key)
+        except self._errors as e:
+            log_event(logger, "cache_backend_error", logging.WARNING, operation="get", error=str(e))
+            return None
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            await self._client.set(self._prefix + key, value, px=max(1, int(ttl * 1000)))
+        except self._errors as e:
+            log_event(logger, "cache_backend_error", logging.WARNING, operation="set", error=str(e))
+
+    async def delete(self, *keys: str) -> None:
+        if not keys:
+            return
+        try:
+            await self._client.delete(*(self._prefix + key for key in keys))
+        except self._errors as e:
+            log_event(logger, "cache_backend_error", logging.WARNING, operation="delete", error=str(e))
+
+
+def create_backend(url: str, max_size: int):
+    """根据连接串创建存储后端：为空时使用进程内存储，redis:// / rediss:// 使用 Redis"""
+    if not url:
+        return LocalBackend(max_size)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"不支持的缓存连接串: {url}")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+下单冷却预占
+
+同一用户在同一店铺24小时内只能下一单。通过 order_cooldowns 表的
+(user_name, shop_name) 主键做单条 upsert：冷却已过期（或不存在）时写入新任务，
+否则保留原任务，由数据库行锁保证并发请求中只有一个能拿到冷却期。
+
+冷却记录只会在过期后被替换，所以进程内缓存中尚未过期的冷却截止时间一定与
+数据库一致，重复被拒绝的请求可以直接由缓存回答；缓存未命中时回退到数据库。
+过期的冷却记录由 scripts/archive_tasks.py 定期删除
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import case
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache import TTLCache
+from src.database import OrderCooldown
+from src.queries import cooldown_query, cooldowns_query
+
+# 冷却时长
+COOLDOWN_PERIOD = timedelta(hours=24)
+
+# 冷却缓存容量（设置为 0 关闭缓存）
+COOLDOWN_CACHE_SIZE = int(os.getenv("COOLDOWN_CACHE_SIZE", "10000"))
+
+# (user_name, shop_name) -> (持有冷却期的任务UUID, 冷却截止时间UTC)
+cooldown_cache = TTLCache(max_size=COOLDOWN_CACHE_SIZE)
+
+
+def as_utc(value: datetime) -> datetime:
+    """数据库中的 naive datetime 按 UTC 处理，统一转换为带时区的 UTC 时间"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """转换为 naive UTC 时间（order_cooldowns 使用 DATETIME 存储 UTC）"""
+    return as_utc(value).replace(tzinfo=None)
+
+
+def build_reserve_statement(dialect_name: str, rows: list[dict], now: datetime):
+    """
+    构造冷却预占 upsert 语句
+
+    rows 中每一项包含 user_name、shop_name、task_uuid、cooldown_until；
+    已存在且未过期的冷却记录保持不变，过期记录被新任务覆盖
+    """
+    if dialect_name == "mysql":
+        stmt = mysql.insert(OrderCooldown).values(rows)
+        expired = OrderCooldown.cooldown_until <= now
+        # MySQL 按从左到右的顺序执行赋值，task_uuid 必须在 cooldown_until 之前更新
+        return stmt.on_duplicate_key_update([
+            ("task_uuid", case((expired, stmt.inserted.task_uuid), else_=OrderCooldown.task_uuid)),
+            ("cooldown_until", case((expired, stmt.inserted.cooldown_until), else_=OrderCooldown.cooldown_until)),
+        ])
+
+    if dialect_name in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect_name == "sqlite" else postgresql.insert
+        stmt = insert(OrderCooldown).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[OrderCooldown.user_name, OrderCooldown.shop_name],
+            set_={
+                "task_uuid": stmt.excluded.task_uuid,
+                "cooldown_until": stmt.excluded.cooldown_until,
+            },
+            where=OrderCooldown.cooldown_until <= now,
+        )
+
+    raise NotImplementedError(f"不支持的数据库类型: {dialect_name}")
+
+
+async def reserve_cooldown(
+    db: AsyncSession, user_name: str, shop_name: str, task_uuid: str, now: datetime
+) -> tuple[str, datetime]:
+    """
+    为任务预占用户在店铺的冷却期
+
+    返回 (持有冷却期的任务UUID, 冷却截止时间UTC)。持有者等于传入的 task_uuid
+    表示预占成功；调用方需要在同一事务内写入任务后再提交
+    """
+    now = to_naive_utc(now)
+    stmt = build_reserve_statement(
+        db.bind.dialect.name,
+        [{
+            "user_name": user_name,
+            "shop_name": shop_name,
+            "task_uuid": task_uuid,
+            "cooldown_until": now + COOLDOWN_PERIOD,
+        }],
+        now,
+    )
+    await db.execute(stmt)
+
+    # 加锁读回最终持有者：普通 SELECT 在 REPEATABLE READ 下读的是事务快照，
+    # 事务中更早的查询（如幂等键查询）已建立快照时会漏掉其他请求刚提交的持有者
+    result = await db.execute(cooldown_query(user_name, shop_name).with_for_update())
+    holder_uuid, cooldown_until = result.one()
+    return holder_uuid, as_utc(cooldown_until)
+
+
+async def reserve_cooldowns(
+    db: AsyncSession, reservations: dict[tuple[str, str], str], now: datetime
+) -> dict[tuple[str, str], tuple[str, datetime]]:
+    """
+    批量预占冷却期
+
+    reservations 为 {(user_name, shop_name): task_uuid}；一条多行 upsert 加一次
+    分组查询完成全部预占，返回 {(user_name, shop_name): (持有者UUID, 冷却截止时间UTC)}
+    """
+    if not reservations:
+        return {}
+
+    now = to_naive_utc(now)
+    # 按主键顺序写入，降低并发批量请求之间的死锁概率
+    pairs = sorted(reservations)
+    stmt = build_reserve_statement(
+        db.bind.dialect.name,
+        [{
+            "user_name": user_name,
+            "shop_name": shop_name,
+            "task_uuid": reservations[(user_name, shop_name)],
+            "cooldown_until": now + COOLDOWN_PERIOD,
+        } for user_name, shop_name in pairs],
+        now,
+    )
+    await db.execute(stmt)
+
+    # 与单条预占相同，加锁读回以读到最新提交的持有者
+    result = await db.execute(cooldowns_query(pairs).with_for_update())
+    return {
+        (row.user_name, row.shop_name): (row.task_uuid, as_utc(row.cooldown_until))
+        for row in result
+    }
+
+
+def remember_cooldown(user_name: str, shop_name: str, task_uuid: str, cooldown_until: datetime) -> None:
+    """记录冷却期，缓存项在冷却截止时自动过期"""
+    ttl = (cooldown_until - datetime.now(timezone.utc)).total_seconds()
+    cooldown_cache.set((user_name, shop_name), (task_uuid, cooldown_until), ttl=ttl)
+
+
+def cached_cooldown(user_name: str, shop_name: str, now: datetime) -> Optional[tuple[str, datetime]]:
+    """查询缓存中仍然有效的冷却期，返回 (任务UUID, 冷却截止时间UTC)；未命中返回 None"""
+    entry = cooldown_cache.get((user_name, shop_name))
+    if entry is None or entry[1] <= now:
+        return None
+    return entry
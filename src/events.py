@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+任务变更通知
+
+进程内的发布/订阅：创建和更新任务的接口在提交后发布事件，
+SSE 和长轮询接口按用户或任务订阅，客户端不用再反复轮询当前任务接口。
+
+事件只在当前进程内分发：多 worker 部署时客户端只能收到同一 worker 处理的写请求，
+需要让写请求和订阅落在同一进程（单 worker 或按用户粘滞路由）
+"""
+
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import OrderTask
+from src.serialization import dumps
+
+# 每个订阅者最多积压的事件数，超出时丢弃最旧的事件
+SUBSCRIBER_QUEUE_SIZE = 100
+# SSE 空闲时发送心跳的间隔（秒）
+SSE_KEEPALIVE = float(os.getenv("SSE_KEEPALIVE", "15"))
+# 单个 SSE 连接的最长持续时间（秒）：到期后服务端结束响应，由客户端按 retry 自动重连。
+# 长连接不会被 uvicorn 优雅退出打断，限制时长保证发布重启时连接能在有限时间内排空
+SSE_MAX_DURATION = float(os.getenv("SSE_MAX_DURATION", "300"))
+
+
+def user_topic(user_name: str) -> str:
+    return f"user:{user_name}"
+
+
+def task_topic(task_uuid: str) -> str:
+    return f"task:{task_uuid}"
+
+
+class ChangeBus:
+    """按主题分发事件；所有操作都在事件循环线程内完成，不需要加锁"""
+
+    def __init__(self):
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self.dropped = 0
+
+    @property
+    def active(self) -> bool:
+        """是否有订阅者（没有订阅者时发布方可以跳过组装事件的查询）"""
+        return bool(self._subscribers)
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    @contextmanager
+    def subscribe(self, topic: str) -> Iterator[asyncio.Queue]:
+        """订阅主题，退出上下文时自动取消订阅"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(topic, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(topic)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[topic]
+
+    def publish(self, event: dict) -> None:
+        """发布任务事件，同时投递给该任务和该任务所属用户的订阅者"""
+        for topic in (task_topic(event["task_uuid"]), user_topic(event["user_name"])):
+            for queue in self._subscribers.get(topic, ()):
+                if queue.full():
+                    queue.get_nowait()
+                    self.dropped += 1
+                queue.put_nowait(event)
+
+
+change_bus = ChangeBus()
+
+
+def task_event(event_type: str, task_id: int, task_uuid: str, user_name: str, shop_name: str,
+               order_status: int) -> dict:
+    """组装任务事件"""
+    return {
+        "type": event_type,
+        "task_id": task_id,
+        "task_uuid": task_uuid,
+        "user_name": user_name,
+        "shop_name": shop_name,
+        "order_status": order_status,
+    }
+
+
+def format_sse(event: dict) -> bytes:
+    """按 text/event-stream 格式编码一条事件"""
+    return f"event: {event['type']}\ndata: ".encode("utf-8") + dumps(event) + b"\n\n"
+
+
+async def sse_stream(topic: str) -> AsyncIterator[bytes]:
+    """
+    订阅主题并持续输出 SSE 事件，持续 SSE_MAX_DURATION 秒后结束
+
+    空闲时每隔 SSE_KEEPALIVE 秒发送一行注释，防止代理因连接空闲而断开；
+    客户端断开时生成器被取消，订阅随上下文一起取消
+    """
+    deadline = time.monotonic() + SSE_MAX_DURATION
+    with change_bus.subscribe(topic) as queue:
+        yield b"retry: 3000\n\n"
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=min(SSE_KEEPALIVE, remaining))
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            yield format_sse(event)
+
+
+async def next_event(queue: asyncio.Queue, timeout: float) -> Optional[dict]:
+    """长轮询：等待已订阅队列的下一条事件，超时返回 None"""
+    try:
+        return await asyncio.wait_for(queue.get(), timeout=timeout)
+    except asyncio.TimeoutError:
+        return None
+
+
+async def publish_task_updates(db: AsyncSession, task_uuids: list[str]) -> None:
+    """
+    任务更新提交后发布事件
+
+    更新接口不知道任务属于哪个用户，需要再查一次；没有任何订阅者时直接跳过
+    """
+    if not change_bus.active or not task_uuids:
+        return
+    result = await db.execute(
+        select(
+            OrderTask.id, OrderTask.task_uuid, OrderTask.user_name, OrderTask.shop_name, OrderTask.order_status
+        ).where(OrderTask.task_uuid.in_(task_uuids))
+    )
+    for row in result:
+        change_bus.publish(task_event(
+            "updated", row.id, row.task_uuid, row.user_name, row.shop_name, row.order_status
+        ))
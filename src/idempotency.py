@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+写请求幂等（Idempotency-Key）
+
+客户端网络重试会把 POST /orders、PATCH /orders/{task_uuid} 完整再执行一遍：重试的下单请求撞上
+自己刚创建的任务，返回“24小时内已有下单任务”而不是首次的成功结果。带 Idempotency-Key 请求头时：
+
+- 首次成功的响应与业务写入在同一事务中写入 idempotency_keys 表，任务创建了响应就一定保存了，
+  不会出现“任务已创建、响应没保存”的窗口；提交后再写入缓存（默认进程内 LRU，配置 CACHE_URL 时为 Redis）
+- 重复的键先查缓存、再查数据库，命中后直接返回保存的响应（响应头 Idempotent-Replayed: true），不访问 order_tasks
+- 只保存成功的响应：被冷却期拒绝、更新失败等结果不保存，重试时重新处理
+- 同一个键用于内容不同的请求（方法、路径或请求体不同）时返回 422
+- 同一进程内同一个键的并发请求排队执行，后到的请求直接拿到先到请求保存的结果；
+  不同进程并发时后提交的一方因主键冲突回滚业务写入，再返回先提交一方保存的响应
+
+过期的键在下次使用同一个键时覆盖，由 scripts/archive_tasks.py 定期批量删除。
+
+环境变量：
+  IDEMPOTENCY_TTL         保存响应的秒数（默认 86400，与24小时下单冷却期一致）
+  IDEMPOTENCY_CACHE_SIZE  进程内缓存的最大条目数（默认 10000）
+  CACHE_URL               共享缓存连接串（默认为空，使用进程内缓存）
+"""
+
+import asyncio
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import delete, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache import create_backend
+from src.database import IdempotencyKey
+from src.models import ProductResponse
+from src.serialization import model_response
+
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+CACHE_URL = os.getenv("CACHE_URL", "")
+
+# 请求内容摘要（十六进制 SHA-256）的长度，缓存值为 摘要 + 响应体
+HASH_LENGTH = 64
+
+
+def utc_now() -> datetime:
+    """naive UTC 时间（idempotency_keys 使用 DATETIME 存储 UTC）"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def request_hash(scope: str, payload: BaseModel) -> str:
+    """请求方法、路径和请求体的摘要，scope 形如 "POST /orders\""""
+    digest = hashlib.sha256(scope.encode("utf-8"))
+    digest.update(b"\n")
+    digest.update(payload.model_dump_json().encode("utf-8"))
+    return digest.hexdigest()
+
+
+class IdempotentRequest:
+    """一次带 Idempotency-Key 的请求，接口在提交事务前调用 save() 保存响应"""
+
+    def __init__(self, key: str, fingerprint: str, ttl: float):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.ttl = ttl
+        self.body: Optional[bytes] = None
+        self._record: Optional[IdempotencyKey] = None
+
+    async def save(self, db: AsyncSession, response: BaseModel) -> None:
+        """把响应加入调用方的事务，随业务写入一起提交；同一个键过期的旧记录一并删除"""
+        self.body = response.model_dump_json().encode("utf-8")
+        now = utc_now()
+        await db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.idempotency_key == self.key, IdempotencyKey.expires_at <= now)
+        )
+        self._record = IdempotencyKey(
+            idempotency_key=self.key,
+            request_hash=self.fingerprint,
+            response_body=self.body.decode("utf-8"),
+            expires_at=now + timedelta(seconds=self.ttl),
+        )
+        db.add(self._record)
+
+    @property
+    def saved(self) -> bool:
+        """响应是否已随事务提交（提交失败回滚后记录回到未持久化状态）"""
+        return self._record is not None and inspect(self._record).has_identity
+
+
+class IdempotencyStore:
+    """保存和重放幂等键对应的响应"""
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # 重放次数：{来源: 次数}，来源为 cache / database
+        self.replays = {"cache": 0, "database": 0}
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        # 共享存储不统计条目数
+        return len(self.backend) if hasattr(self.backend, "__len__") else 0
+
+    async def lookup(self, db: AsyncSession, key: str) -> Optional[tuple[str, bytes, str]]:
+        """查找未过期的响应，返回 (请求摘要, 响应体, 来源)"""
+        cached = await self.backend.get(f"idempotency:{key}")
+        if cached is not None:
+            self.hits += 1
+            return cached[:HASH_LENGTH].decode("ascii"), cached[HASH_LENGTH:], "cache"
+        self.misses += 1
+
+        result = await db.execute(
+            select(IdempotencyKey.request_hash, IdempotencyKey.response_body, IdempotencyKey.expires_at)
+            .where(IdempotencyKey.idempotency_key == key, IdempotencyKey.expires_at > utc_now())
+        )
+        row = result.first()
+        if row is None:
+            return None
+        body = row.response_body.encode("utf-8")
+        # 回填缓存，存活时间不超过数据库中的剩余有效期
+        remaining = (row.expires_at - utc_now()).total_seconds()
+        await self.backend.set(f"idempotency:{key}", row.request_hash.encode("ascii") + body, remaining)
+        return row.request_hash, body, "database"
+
+    def replay(self, request: IdempotentRequest, stored: tuple[str, bytes, str]) -> Response:
+        fingerprint, body, source = stored
+        if fingerprint != request.fingerprint:
+            return model_response(
+                ProductResponse(success=False, message=f"Idempotency-Key {request.key} 已用于内容不同的请求"),
+                status_code=422,
+            )
+        self.replays[source] += 1
+        return Response(content=body, media_type="application/json", headers={"Idempotent-Replayed": "true"})
+
+    async def run(
+        self, db: AsyncSession, request: IdempotentRequest,
+        handler: Callable[[IdempotentRequest], Awaitable[Response]]
+    ) -> Response:
+        """已有保存的响应时直接重放，否则执行 handler 并在其保存响应后写入缓存"""
+        # 同一进程内同一个键的请求逐个执行
+        while (waiting := self._inflight.get(request.key)) is not None:
+            await asyncio.shield(waiting)
+        done = asyncio.get_running_loop().create_future()
+        self._inflight[request.key] = done
+        try:
+            stored = await self.lookup(db, request.key)
+            if stored is not None:
+                return self.replay(request, stored)
+            # 结束查询开启的只读事务，接口的写事务从新的快照开始
+            if db.in_transaction():
+                await db.rollback()
+            response = await handler(request)
+        finally:
+            del self._inflight[request.key]
+            done.set_result(None)
+
+        if request.saved:
+            await self.backend.set(
+                f"idempotency:{request.key}", request.fingerprint.encode("ascii") + request.body, request.ttl
+            )
+            return response
+
+        # 没有保存（失败、被拒绝或提交时主键冲突）：其他进程可能刚处理完同一个键
+        stored = await self.lookup(db, request.key)
+        if stored is not None:
+            return self.replay(request, stored)
+        return response
+
+
+idempotency_store = IdempotencyStore(create_backend(CACHE_URL, IDEMPOTENCY_CACHE_SIZE), IDEMPOTENCY_TTL)
+
+
+async def idempotent(
+    db: AsyncSession, key: Optional[str], scope: str, payload: BaseModel,
+    handler: Callable[[Optional[IdempotentRequest]], Awaitable[Response]]
+) -> Response:
+    """按 Idempotency-Key 执行写接口；没有带键时直接执行 handler(None)"""
+    if not key:
+        return await handler(None)
+    request = IdempotentRequest(key, request_hash(scope, payload), idempotency_store.ttl)
+    return await idempotency_store.run(db, request, handler)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+结构化日志配置
+
+请求处理线程只把日志记录放入内存队列，由后台 QueueListener 线程负责格式化和写出，
+避免同步写 stdout 阻塞事件循环。通过环境变量配置：
+  LOG_LEVEL        日志级别（默认 INFO）
+  LOG_FORMAT       json / text（默认 text）
+  LOG_SAMPLE_RATE  INFO 及以下级别日志的采样率 0~1（默认 1，WARNING 及以上始终输出）
+  SQL_ECHO         是否输出SQL语句（默认关闭），同样经由日志队列输出
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() in ("1", "true", "yes")
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", {}))
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """开发环境可读格式：时间 级别 事件 key=value ..."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name} {record.getMessage()}"
+        fields = getattr(record, "fields", {})
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """按采样率丢弃 INFO 及以下级别的日志，WARNING 及以上始终保留"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+def setup_logging() -> None:
+    """配置根日志器：QueueHandler 入队，后台线程输出（重复调用无副作用）"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    handler = QueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(handler)
+
+    # 不使用 create_engine(echo=True)：它会给 sqlalchemy.engine 挂一个同步写 stdout 的处理器
+    if SQL_ECHO:
+        logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    # 进程退出前把队列中剩余的日志写完
+    atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """获取日志器"""
+    return logging.getLogger(name)
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields) -> None:
+    """输出一条结构化事件日志，fields 作为独立字段输出"""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Prometheus 文本格式指标
+
+只实现服务需要的 Counter / Histogram / 回调 Gauge，不引入额外依赖。
+指标记录都发生在事件循环线程（SQLAlchemy 异步引擎的游标事件也在该线程执行），
+记录路径上不加锁：Counter 是一次字典读写，Histogram 只累加命中的那一个桶，
+累计值在 /metrics 渲染时才计算
+"""
+
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+# 默认延迟分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 指标渲染时 Gauge 回调的返回值：[(标签值元组, 数值)]
+GaugeSamples = Iterable[tuple[tuple, float]]
+
+
+def _escape(value) -> str:
+    """转义标签值中的反斜杠、双引号和换行"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    """渲染 {name="value",...} 标签"""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """单调递增计数器"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in list(self._values.items())
+        ]
+
+
+class Histogram:
+    """固定分桶直方图"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # 标签值元组 -> [各桶计数（最后一个为 +Inf）, 总和]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> list[str]:
+        lines = []
+        for labels, (counts, total) in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class CallbackGauge:
+    """渲染时通过回调取值的 Gauge（连接池、缓存等状态类指标）"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], GaugeSamples], labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.callback = callback
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in self.callback()
+        ]
+
+
+class CallbackCounter(CallbackGauge):
+    """渲染时通过回调取值的计数器（已有对象内部维护的累计值）"""
+
+    type_name = "counter"
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """渲染 Prometheus 文本格式"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "ordertracker_http_requests_total", "HTTP 请求数", ("method", "route", "status")
+))
+HTTP_LATENCY = registry.register(Histogram(
+    "ordertracker_http_request_duration_seconds", "HTTP 请求处理耗时", ("method", "route")
+))
+COOLDOWN_REJECTIONS = registry.register(Counter(
+    "ordertracker_cooldown_rejections_total", "24小时冷却期内被拒绝的下单数", ("source",)
+))
+TASKS_CLAIMED = registry.register(Counter(
+    "ordertracker_tasks_claimed_total", "被 worker 领取的任务数（expired 为租约到期后重新领取）", ("source",)
+))
+DB_QUERIES = registry.register(Counter(
+    "ordertracker_db_queries_total", "数据库语句执行次数", ("statement",)
+))
+DB_QUERY_LATENCY = registry.register(Histogram(
+    "ordertracker_db_query_duration_seconds", "数据库语句执行耗时", ("statement",)
+))
+
+
+class MetricsMiddleware:
+    """
+    记录每个请求的计数和耗时（纯 ASGI 中间件）
+
+    路由标签使用路由模板（如 /orders/{task_uuid}），未匹配到路由的请求记为 unmatched，
+    避免路径参数导致标签数量无限增长
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            HTTP_REQUESTS.inc(scope["method"], route_path, status)
+            HTTP_LATENCY.observe(time.perf_counter() - start, scope["method"], route_path)
+
+
+def instrument_engine(async_engine) -> None:
+    """为异步引擎注册语句计时事件和连接池指标"""
+    from sqlalchemy import event
+
+    sync_engine = async_engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERIES.inc(verb)
+        DB_QUERY_LATENCY.observe(elapsed, verb)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        # 执行失败的语句不会触发 after_cursor_execute，弹出它的开始时间，
+        # 否则连接归还连接池后列表越积越长，之后的计时与错误的开始时间配对
+        conn = exception_context.connection
+        if conn is None or exception_context.execution_context is None:
+            return
+        starts = conn.info.get("query_start_time")
+        if starts:
+            starts.pop()
+
+    pool = sync_engine.pool
+
+    def pool_stat(method_name: str) -> Callable[[], GaugeSamples]:
+        def collect():
+            method = getattr(pool, method_name, None)
+            # QueuePool.overflow() 在未溢出时为负数（从 -pool_size 开始计数），按 0 输出
+            return [((), max(0, method()))] if method is not None else []
+        return collect
+
+    for name, method_name, documentation in (
+        ("ordertracker_db_pool_size", "size", "连接池大小"),
+        ("ordertracker_db_pool_checked_out", "checkedout", "已借出的连接数"),
+        ("ordertracker_db_pool_checked_in", "checkedin", "池中空闲的连接数"),
+        ("ordertracker_db_pool_overflow", "overflow", "超出 pool_size 的溢出连接数"),
+    ):
+        registry.register(CallbackGauge(name, documentation, pool_stat(method_name)))
+
+
+def register_cache(name: str, cache) -> None:
+    """注册缓存的命中 / 未命中 / 命中率 / 容量指标（cache 需提供 hits、misses 和 len()）"""
+    registry.register(CallbackCounter(
+        f"ordertracker_{name}_cache_hits_total", f"{name} 缓存命中次数", lambda: [((), cache.hits)]
+    ))
+    registry.register(CallbackCounter(
+        f"ordertracker_{name}_cache_misses_total", f"{name} 缓存未命中次数", lambda: [((), cache.misses)]
+    ))
+    registry.register(CallbackGauge(
+        f"ordertracker_{name}_cache_hit_ratio", f"{name} 缓存命中率（进程启动以来）",
+        lambda: [((), cache.hits / (cache.hits + cache.misses) if cache.hits + cache.misses else 0.0)]
+    ))
+    registry.register(CallbackGauge(
+        f"ordertracker_{name}_cache_size", f"{name} 缓存当前条目数", lambda: [((), len(cache))]
+    ))
@@ -4,7 +4,7 @@ Pydantic模型定义
 """
 
 from pydantic import BaseModel, HttpUrl, Field
-from typing import Optional
+from typing import Any, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -40,6 +40,14 @@ class ProductResponse(BaseModel):
     task_id: Optional[int] = None
     task_uuid: Optional[str] = None
 
+# 批量下单响应模型（results 与请求列表一一对应）
+class BatchProductResponse(BaseModel):
+    success: bool
+    message: Optional[str] = None
+    created_count: int = 0
+    rejected_count: int = 0
+    results: list[ProductResponse] = []
+
 # 下单任务详情模型
 class OrderTaskDetail(BaseModel):
     id: int
@@ -68,7 +76,9 @@ class OrderTaskListResponse(BaseModel):
     success: bool
     message: Optional[str] = None
     tasks: list[OrderTaskDetail] = []
-    total: int = 0
+    total: int = 0  # 本页返回的任务数
+    next_cursor: Optional[str] = None  # 下一页游标，没有更多数据时为空
+    approximate_total: Optional[int] = None  # 按查询条件估算的总数（include_total=true 且数据库支持时返回）
 
 # 更新下单状态请求模型
 class UpdateOrderStatusRequest(BaseModel):
@@ -106,6 +116,18 @@ class UpdateOrderInfoRequest(BaseModel):
             }
         }
 
+# 批量更新订单信息请求项
+class BulkUpdateOrderItem(UpdateOrderInfoRequest):
+    task_uuid: str = Field(..., description="任务唯一标识UUID")
+
+# 批量更新订单信息响应模型（results 与请求列表一一对应）
+class BulkUpdateOrderResponse(BaseModel):
+    success: bool
+    message: Optional[str] = None
+    updated_count: int = 0
+    not_found: list[str] = []
+    results: list[ProductResponse] = []
+
 # 下单任务统计模型
 class OrderTaskStats(BaseModel):
     processing_count: int = 0
@@ -124,3 +146,52 @@ class CurrentTaskResponse(BaseModel):
     success: bool
     message: Optional[str] = None
     task: Optional[OrderTaskDetail] = None
+
+# 任务变更事件模型（SSE 推送和长轮询共用）
+class TaskChangeEvent(BaseModel):
+    type: str = Field(..., description="事件类型：created-创建、updated-更新、current-发起等待时状态已变化")
+    task_id: int
+    task_uuid: str
+    user_name: str
+    shop_name: str
+    order_status: OrderStatusEnum
+
+# 长轮询等待任务变更的响应模型
+class TaskWaitResponse(BaseModel):
+    success: bool
+    message: Optional[str] = None
+    changed: bool = False
+    event: Optional[TaskChangeEvent] = None
+
+# 写入队列中待落库更新的响应模型
+class PendingUpdateResponse(BaseModel):
+    success: bool
+    message: Optional[str] = None
+    task_uuid: Optional[str] = None
+    pending_count: int = 0
+    fields: dict[str, Any] = Field(default_factory=dict, description="待写入的字段（按到达顺序合并，后到的覆盖先到的）")
+
+# 领取任务请求模型
+class ClaimTasksRequest(BaseModel):
+    worker_id: str = Field(..., min_length=1, max_length=100, description="worker 标识，续约和归还时使用同一个值")
+    limit: int = Field(1, ge=1, description="最多领取的任务数")
+    lease_seconds: Optional[int] = Field(None, gt=0, description="租约秒数，为空时使用服务端默认值")
+
+# 领取任务响应模型
+class ClaimTasksResponse(BaseModel):
+    success: bool
+    message: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None  # 本次领取的任务的租约到期时间（数据库时钟）
+    tasks: list[OrderTaskDetail] = []
+
+# 续约 / 归还任务请求模型
+class TaskLeaseRequest(BaseModel):
+    worker_id: str = Field(..., min_length=1, max_length=100, description="领取任务时使用的 worker 标识")
+    lease_seconds: Optional[int] = Field(None, gt=0, description="续约秒数，为空时使用服务端默认值")
+
+# 续约 / 归还任务响应模型
+class TaskLeaseResponse(BaseModel):
+    success: bool
+    message: Optional[str] = None
+    task_uuid: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
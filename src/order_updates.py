@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+订单信息更新
+
+单条更新和批量更新共用同一套字段映射和状态判断规则
+"""
+
+from typing import Optional
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from src.database import OrderTask
+from src.models import UpdateOrderInfoRequest
+from src.stats import StatDeltas, apply_stat_deltas, status_change_delta
+
+# 可直接更新的字段及其日志名称（按更新日志的输出顺序排列）
+INFO_FIELDS = [
+    ("order_id", "订单号"),
+    ("alipay_trade_no", "支付宝交易号"),
+    ("receiver_name", "收货人"),
+    ("receiver_address", "收货地址"),
+    ("receiver_phone", "收货电话"),
+]
+
+
+def build_update_values(order_info: UpdateOrderInfoRequest) -> tuple[dict, list[str]]:
+    """
+    根据请求生成要写入的列值和更新日志
+
+    只包含请求中提供的非空字段；completed_at 为 SQL 表达式 now()
+    """
+    values = {}
+    updated_fields = []
+
+    for column, label in INFO_FIELDS:
+        value = getattr(order_info, column)
+        if value is not None:
+            values[column] = value
+            updated_fields.append(f"{label}: {value}")
+
+    # 智能判断订单状态
+    if order_info.order_status is not None:
+        # 用户明确指定了状态
+        values["order_status"] = int(order_info.order_status)
+        if order_info.order_status == 2:  # 完成
+            values["completed_at"] = func.now()
+        updated_fields.append(f"订单状态: {int(order_info.order_status)}")
+    elif (order_info.order_id is not None and
+          order_info.alipay_trade_no is not None and
+          order_info.receiver_name is not None):
+        # 如果提供了订单号、支付宝交易号和收货人信息，自动设置为完成
+        values["order_status"] = 2  # 完成
+        values["completed_at"] = func.now()
+        updated_fields.append("订单状态: 2 (完成-自动设置)")
+
+    if order_info.error_message is not None:
+        values["error_message"] = order_info.error_message
+        updated_fields.append(f"错误信息: {order_info.error_message}")
+
+    return values, updated_fields
+
+
+def changes_status(order_info: UpdateOrderInfoRequest) -> bool:
+    """请求是否会修改订单状态（显式指定，或提供完整订单信息自动置为完成）"""
+    return "order_status" in build_update_values(order_info)[0]
+
+
+async def update_task(db: AsyncSession, task_uuid: str, values: dict) -> Optional[int]:
+    """
+    单条更新订单信息
+
+    一条 UPDATE ... WHERE task_uuid = :uuid 完成更新并取回任务ID，任务不存在时返回 None。
+    涉及状态变更时先在同一事务内锁定该行读取原状态，用于维护统计汇总表。
+    调用方负责提交事务
+
+    状态变更多出的一次锁定读不能并入 UPDATE：统计增量除了原状态还需要 shop_name 和 created_at，
+    MySQL 的 UPDATE 没有 RETURNING，LAST_INSERT_ID(expr) 只能带回一个整数。
+    每个任务一生只有一到两次状态变更，这次往返只出现在这条低频路径上；
+    锁定读已经定位到行，随后的 UPDATE 按 (id, created_at) 主键只访问该行所在的分区
+    """
+    table = OrderTask.__table__
+
+    if "order_status" in values:
+        result = await db.execute(
+            select(table.c.id, table.c.order_status, table.c.shop_name, table.c.created_at)
+            .where(table.c.task_uuid == task_uuid)
+            .with_for_update()
+        )
+        previous = result.first()
+        if previous is None:
+            return None
+
+        await db.execute(
+            update(table)
+            .where(table.c.id == previous.id, table.c.created_at == previous.created_at)
+            .values(values)
+        )
+
+        deltas = StatDeltas()
+        status_change_delta(
+            deltas, previous.created_at, previous.shop_name, previous.order_status, values["order_status"]
+        )
+        await apply_stat_deltas(db, deltas)
+        return previous.id
+
+    if not values:
+        # 没有需要更新的字段，只确认任务是否存在
+        result = await db.execute(select(table.c.id).where(table.c.task_uuid == task_uuid))
+        return result.scalar_one_or_none()
+
+    stmt = update(table).where(table.c.task_uuid == task_uuid)
+    conn = await db.connection()
+    dialect = conn.dialect
+
+    if dialect.update_returning:
+        result = await conn.execute(stmt.values(values).returning(table.c.id))
+        return result.scalar_one_or_none()
+
+    if dialect.name == "mysql":
+        # id = LAST_INSERT_ID(id)：命中行的ID经由 OK 包的 insert_id 返回，
+        # 不需要再查询一次；rowcount 为匹配行数（FOUND_ROWS），用于判断任务是否存在
+        result = await conn.execute(stmt.values(id=func.last_insert_id(table.c.id), **values))
+        return result.lastrowid if result.rowcount else None
+
+    result = await conn.execute(stmt.values(values))
+    if not result.rowcount:
+        return None
+    result = await conn.execute(select(table.c.id).where(table.c.task_uuid == task_uuid))
+    return result.scalar_one_or_none()
+
+
+async def bulk_update_tasks(
+    db: AsyncSession, items: list[tuple[str, UpdateOrderInfoRequest]]
+) -> dict[str, tuple[int, list[str]]]:
+    """
+    批量更新订单信息
+
+    同一任务的多条更新按顺序合并；更新列相同的任务合并为一条 executemany UPDATE。
+    返回 {task_uuid: (任务ID, 更新日志)}，不存在的任务不在返回结果中。调用方负责提交事务
+    """
+    merged: dict[str, tuple[dict, list[str]]] = {}
+    for task_uuid, order_info in items:
+        values, updated_fields = build_update_values(order_info)
+        if task_uuid in merged:
+            merged[task_uuid][0].update(values)
+            merged[task_uuid][1].extend(updated_fields)
+        else:
+            merged[task_uuid] = (values, updated_fields)
+
+    if not merged:
+        return {}
+
+    # 有状态变更时锁定相关行，读取原状态用于维护统计汇总表
+    stmt = select(
+        OrderTask.id, OrderTask.task_uuid, OrderTask.order_status, OrderTask.shop_name, OrderTask.created_at
+    ).where(OrderTask.task_uuid.in_(list(merged)))
+    if any("order_status" in values for values, _ in merged.values()):
+        stmt = stmt.with_for_update()
+    existing = {row.task_uuid: row for row in await db.execute(stmt)}
+    task_ids = {task_uuid: row.id for task_uuid, row in existing.items()}
+
+    # 按更新列分组，每组一条 UPDATE ... WHERE task_uuid = :b_task_uuid 批量执行
+    groups: dict[tuple, list[dict]] = {}
+    for task_uuid, (values, _) in merged.items():
+        if task_uuid not in task_ids or not values:
+            continue
+        params = {f"b_{column}": value for column, value in values.items() if column != "completed_at"}
+        params["b_task_uuid"] = task_uuid
+        groups.setdefault(tuple(sorted(values)), []).append(params)
+
+    table = OrderTask.__table__
+    conn = await db.connection()
+    for columns, params in groups.items():
+        stmt = update(table).where(table.c.task_uuid == bindparam("b_task_uuid")).values({
+            column: func.now() if column == "completed_at" else bindparam(f"b_{column}")
+            for column in columns
+        })
+        await conn.execute(stmt, params)
+
+    deltas = StatDeltas()
+    for task_uuid, (values, _) in merged.items():
+        if task_uuid in existing and "order_status" in values:
+            row = existing[task_uuid]
+            status_change_delta(deltas, row.created_at, row.shop_name, row.order_status, values["order_status"])
+    await apply_stat_deltas(db, deltas)
+
+    return {
+        task_uuid: (task_ids[task_uuid], updated_fields)
+        for task_uuid, (_, updated_fields) in merged.items()
+        if task_uuid in task_ids
+    }
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+order_tasks 按月分区（仅 MySQL）
+
+order_tasks 按 created_at 所在的 UTC 月份做 RANGE 分区，每月一个分区（p202608 保存 2026 年 8 月创建的任务），
+最后是 VALUES LESS THAN MAXVALUE 的兜底分区 p_future。热点查询集中在最近的分区，
+已完成的历史任务由 scripts/archive_tasks.py 迁移到 order_tasks_archive，清空的旧分区整区删除，
+表的活跃数据量保持在保留期内，索引能常驻 buffer pool。
+
+- 分区边界是 UTC 月初的 Unix 时间戳（TIMESTAMP 列只能用 UNIX_TIMESTAMP() 分区），与会话时区无关
+- 分区表的每个唯一键都必须包含分区列：主键为 (id, created_at)，task_uuid 只建普通索引
+- 需要提前建好未来月份的分区，否则新任务落入 p_future；归档脚本每次运行时补齐
+
+环境变量：
+  PARTITION_AHEAD_MONTHS  提前创建的未来月份分区数（默认 3）
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import text
+
+PARTITION_AHEAD_MONTHS = int(os.getenv("PARTITION_AHEAD_MONTHS", "3"))
+FUTURE_PARTITION = "p_future"
+
+
+def month_start(value: datetime) -> datetime:
+    """所在 UTC 月份的第一天零点"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"p{month:%Y%m}"
+
+
+def partition_definition(month: datetime) -> str:
+    """一个月份分区的定义：保存 created_at 早于下月初的行"""
+    bound = int(add_months(month, 1).timestamp())
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ({bound})"
+
+
+def future_definition() -> str:
+    return f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE"
+
+
+def partition_clause(first_month: datetime, last_month: datetime) -> str:
+    """从 first_month 到 last_month（含）逐月分区，外加兜底分区的 PARTITION BY 子句"""
+    definitions = []
+    month = month_start(first_month)
+    while month <= month_start(last_month):
+        definitions.append(partition_definition(month))
+        month = add_months(month, 1)
+    definitions.append(future_definition())
+    return "PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (\n    " + ",\n    ".join(definitions) + "\n)"
+
+
+def partition_new_table(connection) -> None:
+    """
+    新建的 order_tasks 改为分区表（create_all 之后执行，表为空，瞬间完成）
+
+    模型里的主键只有 id（SQLite 的自增只支持单列整数主键），MySQL 上在这里扩展为 (id, created_at)
+    """
+    now = datetime.now(timezone.utc)
+    connection.execute(text(
+        "ALTER TABLE order_tasks DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at) "
+        + partition_clause(now, add_months(month_start(now), PARTITION_AHEAD_MONTHS))
+    ))
+
+
+def list_partitions(connection) -> list[tuple[str, Optional[int]]]:
+    """按顺序返回 (分区名, 上界时间戳)，兜底分区的上界为 None；未分区时返回空列表"""
+    rows = connection.execute(text(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'order_tasks' AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    )).all()
+    return [(name, None if bound == "MAXVALUE" else int(bound)) for name, bound in rows]
+
+
+def ensure_future_partitions(connection, ahead: int = PARTITION_AHEAD_MONTHS) -> list[str]:
+    """
+    从 p_future 拆出到 当前月 + ahead 为止缺少的月份分区，返回新建的分区名
+
+    p_future 为空时只修改元数据；已有行落入 p_future 时拆分会复制这些行
+    """
+    partitions = list_partitions(connection)
+    if not partitions:
+        raise RuntimeError("order_tasks 不是分区表，请先执行数据库迁移")
+
+    # 只有兜底分区时（按 schema.sql 建表）从当前月开始拆分，更早的行都落入第一个月份分区
+    bounds = [bound for _, bound in partitions if bound is not None]
+    current = month_start(datetime.now(timezone.utc))
+    month = datetime.fromtimestamp(max(bounds), timezone.utc) if bounds else current
+    target = add_months(current, ahead)
+    months = []
+    while month <= target:
+        months.append(month)
+        month = add_months(month, 1)
+    if not months:
+        return []
+
+    definitions = [partition_definition(month) for month in months] + [future_definition()]
+    connection.execute(text(
+        f"ALTER TABLE order_tasks REORGANIZE PARTITION {FUTURE_PARTITION} INTO (" + ", ".join(definitions) + ")"
+    ))
+    return [partition_name(month) for month in months]
+
+
+def partition_row_count(connection, name: str) -> int:
+    return connection.execute(text(f"SELECT COUNT(*) FROM order_tasks PARTITION ({name})")).scalar()
+
+
+def drop_partition(connection, name: str) -> None:
+    connection.execute(text(f"ALTER TABLE order_tasks DROP PARTITION {name}"))
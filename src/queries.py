@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+热点查询定义
+
+API 接口和 scripts/explain_queries.py 共用同一份查询构造，
+保证 EXPLAIN 检查的就是线上实际执行的 SQL
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, func, or_, select, tuple_
+
+from src.database import OrderTask, OrderCooldown
+
+
+def cooldown_query(user_name: str, shop_name: str):
+    """用户在店铺的冷却记录（24小时冷却检查）"""
+    return select(OrderCooldown.task_uuid, OrderCooldown.cooldown_until).where(
+        OrderCooldown.user_name == user_name,
+        OrderCooldown.shop_name == shop_name,
+    )
+
+
+def cooldowns_query(pairs: list[tuple[str, str]]):
+    """多个 (user_name, shop_name) 的冷却记录（批量下单一次查询）"""
+    return select(
+        OrderCooldown.user_name, OrderCooldown.shop_name,
+        OrderCooldown.task_uuid, OrderCooldown.cooldown_until
+    ).where(tuple_(OrderCooldown.user_name, OrderCooldown.shop_name).in_(pairs))
+
+
+# 任务详情的列投影：查询结果是普通行而不是 ORM 对象，省去对象构造和会话跟踪的开销，
+# 行按属性访问，可直接交给 OrderTaskDetail.model_validate（租约列不在任务详情中）
+LEASE_COLUMNS = ("lease_owner", "lease_expires_at")
+TASK_DETAIL_COLUMNS = tuple(column for column in OrderTask.__table__.c if column.name not in LEASE_COLUMNS)
+
+
+def current_task_query(user_name: str):
+    """用户当前进行中的最新任务"""
+    return select(*TASK_DETAIL_COLUMNS).where(
+        OrderTask.user_name == user_name,
+        OrderTask.order_status == 1  # 1 = 进行中
+    ).order_by(OrderTask.created_at.desc()).limit(1)
+
+
+def claimable_tasks_query(limit: int):
+    """
+    可领取的任务：进行中且租约已到期（新任务的到期时间为创建时间），按到期时间先后取 limit 条
+
+    FOR UPDATE SKIP LOCKED 跳过其他 worker 正在领取的行，并发领取互不等待；
+    按 idx_status_lease 的顺序扫描，不产生 filesort（filesort 会锁住排序前读到的所有行）
+    """
+    return select(OrderTask.id, OrderTask.created_at).where(
+        OrderTask.order_status == 1,  # 1 = 进行中
+        OrderTask.lease_expires_at <= func.now(),
+    ).order_by(OrderTask.lease_expires_at).limit(limit).with_for_update(skip_locked=True)
+
+
+def task_list_query(
+    user_name: Optional[str] = None,
+    shop_name: Optional[str] = None,
+    order_status: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    after: Optional[tuple[datetime, int]] = None,
+    limit: Optional[int] = None,
+):
+    """
+    任务列表查询，按 (created_at, id) 倒序
+
+    after 为上一页最后一条的 (created_at, id)，使用键集分页：
+    无论翻到第几页都只是一次索引范围扫描，不会像 OFFSET 那样越翻越慢
+    """
+    conditions = []
+    if user_name is not None:
+        conditions.append(OrderTask.user_name == user_name)
+    if shop_name is not None:
+        conditions.append(OrderTask.shop_name == shop_name)
+    if order_status is not None:
+        conditions.append(OrderTask.order_status == order_status)
+    if created_from is not None:
+        conditions.append(OrderTask.created_at >= created_from)
+    if created_to is not None:
+        conditions.append(OrderTask.created_at < created_to)
+    if after is not None:
+        # 展开成 OR 形式，MySQL 对行构造器比较的范围优化不稳定
+        after_created_at, after_id = after
+        conditions.append(or_(
+            OrderTask.created_at < after_created_at,
+            and_(OrderTask.created_at == after_created_at, OrderTask.id < after_id),
+        ))
+
+    stmt = select(*TASK_DETAIL_COLUMNS).where(*conditions).order_by(OrderTask.created_at.desc(), OrderTask.id.desc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def to_driver_sql(stmt, dialect):
+    """把查询编译成驱动层 SQL 和参数（用于拼接 EXPLAIN）"""
+    compiled = stmt.compile(dialect=dialect)
+    params = {
+        key: value.strftime("%Y-%m-%d %H:%M:%S") if isinstance(value, datetime) else value
+        for key, value in compiled.params.items()
+    }
+    if compiled.positional:
+        return str(compiled), tuple(params[key] for key in compiled.positiontup)
+    return str(compiled), params
+
+
+async def estimate_row_count(conn, stmt) -> Optional[int]:
+    """
+    通过 MySQL 优化器的 EXPLAIN 估算查询结果行数，代替精确的 COUNT(*)
+
+    估算值来自索引统计信息，只有一次执行计划开销；其他数据库返回 None
+    """
+    if conn.dialect.name != "mysql":
+        return None
+    sql, params = to_driver_sql(stmt, conn.dialect)
+    result = await conn.exec_driver_sql("EXPLAIN " + sql, params)
+    row = result.mappings().first()
+    if row is None or row.get("rows") is None:
+        return None
+    return int(row["rows"] * float(row.get("filtered") or 100) / 100)
+
+
+# 导出字段（对账用，不含 product_url 等大字段）
+EXPORT_COLUMNS = (
+    OrderTask.id, OrderTask.task_uuid, OrderTask.user_name, OrderTask.shop_name,
+    OrderTask.product_price, OrderTask.product_sku, OrderTask.order_status,
+    OrderTask.order_id, OrderTask.alipay_trade_no,
+    OrderTask.receiver_name, OrderTask.receiver_address, OrderTask.receiver_phone,
+    OrderTask.created_at, OrderTask.completed_at,
+)
+
+
+def export_query(
+    order_status: Optional[int] = None,
+    completed_from: Optional[datetime] = None,
+    completed_to: Optional[datetime] = None,
+):
+    """导出查询，按主键顺序输出，只取对账需要的列"""
+    conditions = []
+    if order_status is not None:
+        conditions.append(OrderTask.order_status == order_status)
+    if completed_from is not None:
+        conditions.append(OrderTask.completed_at >= completed_from)
+    if completed_to is not None:
+        conditions.append(OrderTask.completed_at < completed_to)
+    return select(*EXPORT_COLUMNS).where(*conditions).order_by(OrderTask.id)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+只读副本路由（可选）
+
+配置 DATABASE_REPLICA_URLS 后，只读接口（当前任务、任务列表、统计、导出）从副本读取，
+写接口和必须读到最新数据的接口（长轮询等）仍然走主库。
+
+- 多个副本轮询分配；连接失败或连接断开的副本摘除 REPLICA_EJECT_SECONDS 秒，到期后重新参与轮询，
+  所有副本都不可用时回到主库
+- 读己之写：创建 / 更新任务提交后，该用户在 READ_YOUR_WRITES_WINDOW 秒内的读请求走主库，
+  避免复制延迟让刚完成的任务仍显示为进行中（并被写进当前任务缓存）。
+  标记与当前任务缓存使用同一个存储（CACHE_URL），多 worker 部署时同样生效
+- 窗口需要大于正常情况下的复制延迟；延迟超过窗口时仍可能读到旧数据
+
+环境变量：
+  DATABASE_REPLICA_URLS    逗号分隔的副本连接串（同步或异步驱动均可，默认为空即不启用）
+  REPLICA_EJECT_SECONDS    副本出错后被摘除的秒数（默认 30）
+  READ_YOUR_WRITES_WINDOW  写入后该用户读主库的秒数（默认 5，0 表示关闭）
+"""
+
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, Optional
+
+from fastapi import Request
+from sqlalchemy import event, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.cache import create_backend
+from src.database import OrderTask, async_session, pool_options, to_async_url
+from src.logger import get_logger, log_event
+
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_EJECT_SECONDS = float(os.getenv("REPLICA_EJECT_SECONDS", "30"))
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "5"))
+CACHE_URL = os.getenv("CACHE_URL", "")
+# 进程内存储时读己之写标记的最大条目数（标记只存活一个窗口，按每秒写入的用户数估算）
+PIN_CACHE_SIZE = 100000
+
+logger = get_logger("ordertracker.replicas")
+
+
+class Replica:
+    """一个只读副本：独立的连接池和健康状态"""
+
+    def __init__(self, url: str):
+        self.url = to_async_url(url)
+        # 日志和指标中的副本名称（隐藏密码）
+        self.name = make_url(self.url).render_as_string(hide_password=True)
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self._sessionmaker = None
+
+    def session(self) -> AsyncSession:
+        """新建该副本的会话；引擎在第一次使用时创建"""
+        if self._sessionmaker is None:
+            engine = create_async_engine(self.url, **pool_options(self.url))
+            event.listen(engine.sync_engine, "handle_error", self._on_error)
+            self._sessionmaker = async_sessionmaker(
+                bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+            )
+        return self._sessionmaker()
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    def eject(self, error: BaseException) -> None:
+        """摘除副本；已被摘除时只延长摘除时间"""
+        was_healthy = self.healthy
+        self.ejected_until = time.monotonic() + REPLICA_EJECT_SECONDS
+        if was_healthy:
+            self.ejections += 1
+            log_event(
+                logger, "replica_ejected", logging.WARNING,
+                replica=self.name, seconds=REPLICA_EJECT_SECONDS, error=str(error)
+            )
+
+    def _on_error(self, context) -> None:
+        # 建立连接失败（没有 connection）或执行中连接断开时摘除；SQL 本身的错误不影响副本健康状态
+        if context.connection is None or context.is_disconnect:
+            self.eject(context.original_exception)
+
+
+class ReplicaRouter:
+    """按请求选择主库或副本"""
+
+    def __init__(self, urls: list[str], window: float):
+        self.replicas = [Replica(url) for url in urls]
+        self.window = window
+        self._pins = create_backend(CACHE_URL, PIN_CACHE_SIZE)
+        self._next = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def candidates(self) -> list[Replica]:
+        """本次请求依次尝试的健康副本（轮询起点每次后移一位）"""
+        count = len(self.replicas)
+        start, self._next = self._next, (self._next + 1) % count
+        ordered = (self.replicas[(start + offset) % count] for offset in range(count))
+        return [replica for replica in ordered if replica.healthy]
+
+    async def pin_users(self, user_names: Iterable[str]) -> None:
+        """写入提交后调用：这些用户在窗口内的读请求走主库"""
+        if not self.enabled or self.window <= 0:
+            return
+        for user_name in set(user_names):
+            await self._pins.set(f"primary-pin:{user_name}", b"1", self.window)
+
+    async def pinned(self, user_name: Optional[str]) -> bool:
+        if not user_name or self.window <= 0:
+            return False
+        return await self._pins.get(f"primary-pin:{user_name}") is not None
+
+    @asynccontextmanager
+    async def session(self, user_name: Optional[str] = None) -> AsyncIterator[AsyncSession]:
+        """
+        只读会话：优先使用副本，用户处于读己之写窗口或没有可用副本时使用主库
+
+        先建立连接再交给调用方，连接失败的副本当场摘除并换下一个；连接池等待超时不算副本故障，直接抛出
+        """
+        if self.enabled and not await self.pinned(user_name):
+            for replica in self.candidates():
+                session = replica.session()
+                try:
+                    await session.connection()
+                except PoolTimeoutError:
+                    await session.close()
+                    raise
+                except Exception as e:
+                    await session.close()
+                    replica.eject(e)
+                    continue
+                async with session:
+                    yield session
+                return
+
+        async with async_session() as session:
+            yield session
+
+
+replica_router = ReplicaRouter(DATABASE_REPLICA_URLS, READ_YOUR_WRITES_WINDOW)
+
+
+async def get_read_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """只读接口的数据库会话依赖；路径或查询参数中带 user_name 时按该用户判断读己之写"""
+    user_name = request.path_params.get("user_name") or request.query_params.get("user_name")
+    async with replica_router.session(user_name) as db:
+        yield db
+
+
+async def pin_task_owners(db: AsyncSession, task_uuids: list[str]) -> None:
+    """
+    按任务UUID查出所属用户并标记读己之写
+
+    更新接口只知道任务UUID；只有启用了副本时才多这一次主库查询
+    """
+    if not replica_router.enabled or replica_router.window <= 0 or not task_uuids:
+        return
+    result = await db.execute(select(OrderTask.user_name).where(OrderTask.task_uuid.in_(task_uuids)))
+    await replica_router.pin_users(result.scalars().all())
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+响应序列化
+
+接口声明了 response_model 时，FastAPI 会把返回的模型转为字典再校验一遍，
+转换为可 JSON 化的对象后由标准库 json 编码。热点接口返回的模型都是刚构造（已校验）的，这里直接由 pydantic-core
+一次序列化为 JSON 字节返回；response_model 仍然保留，用于生成接口文档。
+
+不经过 pydantic 模型的字典数据（导出、事件推送）安装了 orjson 时使用 orjson 编码
+"""
+
+import json
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """把已校验的响应模型直接序列化为 JSON 响应"""
+    return Response(content=model.model_dump_json(), status_code=status_code, media_type="application/json")
+
+
+def dumps(value) -> bytes:
+    """编码为 JSON 字节串（中文不转义）"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+应用启动流程
+
+STARTUP_SCHEMA_MODE 控制启动时如何处理表结构：
+  create  create_all 建表（默认，本地开发和 SQLite 测试使用）：每次启动都要逐表查询元数据
+  verify  一条查询确认数据库的 Alembic 版本等于代码中的 head，不一致时拒绝启动；
+          表结构只由 alembic upgrade head 管理（scripts/serve.py 的默认模式）
+  skip    不检查
+
+verify 模式下 scripts/serve.py 在启动 worker 前校验一次，把校验通过的版本写入 SCHEMA_VERIFIED_REVISION，
+由它拉起的 worker（包括异常退出后被重新拉起的）直接跳过校验，不再访问数据库。
+
+本模块不导入 src.database：启动脚本在设置连接池等环境变量之前就要读取 head 版本
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from src.logger import log_event
+
+STARTUP_SCHEMA_MODE = os.getenv("STARTUP_SCHEMA_MODE", "create")
+SCHEMA_MODES = ("create", "verify", "skip")
+if STARTUP_SCHEMA_MODE not in SCHEMA_MODES:
+    raise ValueError(f"不支持的 STARTUP_SCHEMA_MODE: {STARTUP_SCHEMA_MODE}（可选 {' / '.join(SCHEMA_MODES)}）")
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SchemaMismatchError(RuntimeError):
+    """数据库的迁移版本与代码不一致"""
+
+
+def alembic_head() -> str:
+    """代码中迁移脚本的 head 版本（只读取本地文件）"""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(os.path.join(project_root, "alembic.ini"))
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+def revision_query():
+    return text("SELECT version_num FROM alembic_version")
+
+
+def check_revision(revision: Optional[str], head: str) -> None:
+    if revision is None:
+        raise SchemaMismatchError(f"数据库没有 Alembic 版本记录，请先执行 alembic upgrade head（代码版本 {head}）")
+    if revision != head:
+        raise SchemaMismatchError(f"数据库迁移版本 {revision} 与代码版本 {head} 不一致，请先执行 alembic upgrade head")
+
+
+async def verify_schema(async_engine) -> str:
+    """
+    确认数据库已迁移到 head，返回校验方式（cached / database）
+
+    由启动脚本拉起的 worker 与启动脚本是同一份代码，启动脚本校验过就直接通过，
+    连加载 alembic 和迁移脚本（约百毫秒）也省掉；否则查询一次 alembic_version（顺带建立连接池的第一个连接）
+    """
+    # 由启动脚本在运行时设置（单 worker 时与应用在同一进程），调用时再读取
+    if os.getenv("SCHEMA_VERIFIED_REVISION"):
+        return "cached"
+    head = alembic_head()
+    async with async_engine.connect() as conn:
+        try:
+            revision = (await conn.execute(revision_query())).scalar()
+        except DBAPIError:
+            # alembic_version 表不存在
+            revision = None
+    check_revision(revision, head)
+    return "database"
+
+
+class StartupTimer:
+    """记录启动各阶段的耗时（总耗时从创建时开始计），结束时输出一条汇总日志"""
+
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self._started
+
+    def report(self, logger, **fields) -> None:
+        log_event(
+            logger, "startup_complete", total_ms=round(self.total * 1000, 1),
+            **{f"{name}_ms": round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+            **fields,
+        )
+
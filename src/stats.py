@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+下单任务统计汇总
+
+order_task_daily_stats 按 (创建日期, 店铺, 状态) 保存任务数，在创建任务和状态变更的
+同一事务中做增量 upsert，统计接口只读汇总表，不再对 order_tasks 做全表 GROUP BY。
+汇总表出现偏差时用 scripts/rebuild_stats.py 从基础表分块重建
+"""
+
+from collections import Counter
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cooldown import as_utc
+from src.database import OrderTaskDailyStat
+from src.models import OrderTaskStats
+
+# (统计日期, 店铺名称, 订单状态) -> 任务数变化量
+StatDeltas = Counter
+
+
+def stat_date(created_at: datetime) -> date:
+    """任务所属的统计日期（按 UTC 日期划分）"""
+    return as_utc(created_at).date()
+
+
+def build_increment_statement(dialect_name: str, rows: list[dict]):
+    """构造汇总表累加 upsert：不存在则插入，存在则 task_count += 增量"""
+    table = OrderTaskDailyStat.__table__
+
+    if dialect_name == "mysql":
+        stmt = mysql.insert(table).values(rows)
+        return stmt.on_duplicate_key_update(task_count=table.c.task_count + stmt.inserted.task_count)
+
+    if dialect_name in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect_name == "sqlite" else postgresql.insert
+        stmt = insert(table).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.stat_date, table.c.shop_name, table.c.order_status],
+            set_={"task_count": table.c.task_count + stmt.excluded.task_count},
+        )
+
+    raise NotImplementedError(f"不支持的数据库类型: {dialect_name}")
+
+
+async def apply_stat_deltas(db: AsyncSession, deltas: StatDeltas) -> None:
+    """把增量写入汇总表（一条多行 upsert），调用方负责提交事务"""
+    rows = [
+        {"stat_date": day, "shop_name": shop_name, "order_status": status, "task_count": delta}
+        for (day, shop_name, status), delta in sorted(deltas.items())
+        if delta
+    ]
+    if rows:
+        await db.execute(build_increment_statement(db.bind.dialect.name, rows))
+
+
+def status_change_delta(deltas: StatDeltas, created_at: datetime, shop_name: str,
+                        old_status: Optional[int], new_status: int) -> None:
+    """把一次状态变更记为旧状态 -1、新状态 +1"""
+    if old_status == new_status:
+        return
+    day = stat_date(created_at)
+    if old_status is not None:
+        deltas[(day, shop_name, old_status)] -= 1
+    deltas[(day, shop_name, new_status)] += 1
+
+
+async def query_stats(
+    db: AsyncSession,
+    shop_name: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> OrderTaskStats:
+    """从汇总表读取各状态任务数"""
+    table = OrderTaskDailyStat.__table__
+    stmt = select(table.c.order_status, func.sum(table.c.task_count)).group_by(table.c.order_status)
+    if shop_name is not None:
+        stmt = stmt.where(table.c.shop_name == shop_name)
+    if date_from is not None:
+        stmt = stmt.where(table.c.stat_date >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(table.c.stat_date <= date_to)
+
+    counts = {status: int(count or 0) for status, count in (await db.execute(stmt)).all()}
+    stats = OrderTaskStats(
+        processing_count=counts.get(1, 0),
+        completed_count=counts.get(2, 0),
+        failed_count=counts.get(3, 0),
+    )
+    stats.total_count = sum(counts.values())
+    return stats
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+用户当前任务缓存
+
+GET /users/{user_name}/orders/current 是调用最频繁的接口（机器人每隔几秒轮询一次），
+而结果只会在该用户创建任务或任务被更新时变化。这里按用户缓存序列化后的响应，
+写接口提交后主动失效，TTL 只作为兜底。
+
+存储后端可替换：默认进程内 LRU（每个 worker 一份），配置 CACHE_URL 后使用 Redis 共享。
+
+环境变量：
+  CURRENT_TASK_CACHE_TTL   缓存存活秒数（默认 30，0 表示关闭缓存）
+  CURRENT_TASK_CACHE_SIZE  进程内缓存的最大条目数（默认 10000）
+  CACHE_URL                共享缓存连接串，如 redis://redis:6379/0（默认为空，使用进程内缓存）
+"""
+
+import os
+import uuid
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache import create_backend
+from src.database import OrderTask
+
+CURRENT_TASK_CACHE_TTL = float(os.getenv("CURRENT_TASK_CACHE_TTL", "30"))
+CURRENT_TASK_CACHE_SIZE = int(os.getenv("CURRENT_TASK_CACHE_SIZE", "10000"))
+CACHE_URL = os.getenv("CACHE_URL", "")
+
+
+class CurrentTaskCache:
+    """
+    按用户名缓存当前任务响应（JSON 字节串）
+
+    三类键：
+      current:<user>        响应内容
+      current-gen:<user>    失效版本号：读库前记下版本，写回前版本已变说明期间发生过写入，放弃写回，
+                            避免慢查询把失效前读到的旧结果重新写进缓存
+      current-task:<uuid>   被缓存的任务属于哪个用户，更新任务时据此找到要失效的用户；
+                            轮询只刷新 current:<user>，索引会先被 LRU 淘汰，状态变更不能只依赖它
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        # 共享存储不统计条目数
+        return len(self.backend) if hasattr(self.backend, "__len__") else 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def get(self, user_name: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        payload = await self.backend.get(f"current:{user_name}")
+        if payload is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return payload
+
+    async def generation(self, user_name: str) -> Optional[bytes]:
+        """读库前调用，记下当前失效版本号"""
+        if not self.enabled:
+            return None
+        return await self.backend.get(f"current-gen:{user_name}")
+
+    async def store(
+        self, user_name: str, generation: Optional[bytes], payload: bytes, task_uuid: Optional[str] = None
+    ) -> None:
+        """写回缓存；读库期间该用户被失效过则放弃"""
+        if not self.enabled or await self.backend.get(f"current-gen:{user_name}") != generation:
+            return
+        if task_uuid is not None:
+            await self.backend.set(f"current-task:{task_uuid}", user_name.encode("utf-8"), self.ttl)
+        await self.backend.set(f"current:{user_name}", payload, self.ttl)
+
+    async def invalidate_users(self, user_names: Iterable[str]) -> None:
+        if not self.enabled:
+            return
+        for user_name in set(user_names):
+            await self.backend.set(f"current-gen:{user_name}", uuid.uuid4().bytes, self.ttl)
+            await self.backend.delete(f"current:{user_name}")
+
+    async def invalidate_tasks(self, task_uuids: Iterable[str]) -> None:
+        """失效缓存中以这些任务为当前任务的用户"""
+        if not self.enabled:
+            return
+        user_names = []
+        for task_uuid in set(task_uuids):
+            user_name = await self.backend.get(f"current-task:{task_uuid}")
+            if user_name is not None:
+                user_names.append(user_name.decode("utf-8"))
+        await self.invalidate_users(user_names)
+
+
+current_task_cache = CurrentTaskCache(
+    create_backend(CACHE_URL, CURRENT_TASK_CACHE_SIZE), CURRENT_TASK_CACHE_TTL
+)
+
+
+async def invalidate_updated_tasks(db: AsyncSession, task_uuids: list[str], status_changed: list[str]) -> None:
+    """
+    任务更新提交后失效相关用户的缓存
+
+    被更新的任务如果正是某个用户缓存中的当前任务，通过任务索引找到该用户；
+    状态变更（status_changed）决定任务是否还是、或是否成为其用户的当前任务，
+    索引可能已被淘汰，按任务查出用户名一并失效
+    """
+    await current_task_cache.invalidate_tasks(task_uuids)
+    if status_changed and current_task_cache.enabled:
+        result = await db.execute(select(OrderTask.user_name).where(OrderTask.task_uuid.in_(status_changed)))
+        await current_task_cache.invalidate_users(result.scalars().all())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+任务工作队列（租约）
+
+下单机器人不再按用户轮询当前任务，而是通过 POST /tasks/claim 从所有进行中的任务里领取：
+- 领取：FOR UPDATE SKIP LOCKED 锁定最早到期的 N 个任务，写入领取者和租约到期时间后提交；
+  并发领取的 worker 跳过彼此锁定的行，互不等待，也不会领到同一个任务
+- 续约：处理时间可能超过租约时由持有者延长到期时间；任务已被其他 worker 领走时续约失败
+- 重新入队：不需要后台任务，租约到期且仍为进行中的任务本身就满足领取条件，
+  按到期时间与新任务一起排队，被下一次领取拿走
+- 任务完成或失败（PATCH 更新状态）后不再满足领取条件，lease_owner 保留用于追查
+
+租约时间都按数据库时钟计算，不受各 worker 时钟偏差影响。
+领取和续约不改变任务的业务字段，保留 updated_at，当前任务缓存也不需要失效
+
+环境变量：
+  TASK_LEASE_SECONDS      默认租约秒数（默认 300）
+  TASK_LEASE_MAX_SECONDS  领取 / 续约允许的最长租约秒数（默认 3600）
+  CLAIM_MAX_SIZE          单次最多领取的任务数（默认 100）
+"""
+
+import os
+from typing import Optional
+
+from sqlalchemy import literal_column, select, tuple_, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from src.database import OrderTask
+from src.queries import TASK_DETAIL_COLUMNS, claimable_tasks_query
+
+TASK_LEASE_SECONDS = int(os.getenv("TASK_LEASE_SECONDS", "300"))
+TASK_LEASE_MAX_SECONDS = int(os.getenv("TASK_LEASE_MAX_SECONDS", "3600"))
+CLAIM_MAX_SIZE = int(os.getenv("CLAIM_MAX_SIZE", "100"))
+
+
+def lease_deadline(dialect, seconds: int):
+    """数据库时钟上 now() + seconds 的 SQL 表达式"""
+    if dialect.name == "sqlite":
+        # 与 CURRENT_TIMESTAMP 相同的 UTC 字符串格式
+        return func.datetime("now", f"+{seconds} seconds")
+    return func.timestampadd(literal_column("SECOND"), seconds, func.now())
+
+
+def lease_values(**values) -> dict:
+    """租约更新的列值：显式写回 updated_at，避免 ON UPDATE CURRENT_TIMESTAMP 把领取当成业务更新"""
+    return {**values, "updated_at": OrderTask.__table__.c.updated_at}
+
+
+async def claim_tasks(db: AsyncSession, worker_id: str, limit: int, lease_seconds: int) -> tuple[list[Row], int]:
+    """
+    为 worker 领取最多 limit 个任务
+
+    返回 (任务详情行（含 lease_expires_at）, 其中租约到期后被重新领取的任务数)。调用方负责提交事务
+    """
+    table = OrderTask.__table__
+    conn = await db.connection()
+
+    # 锁定要领取的行；分区表上按 (id, created_at) 定位，只访问各行所在的分区
+    result = await db.execute(claimable_tasks_query(limit).add_columns(table.c.lease_owner))
+    claimed = result.all()
+    if not claimed:
+        return [], 0
+
+    keys = tuple_(table.c.id, table.c.created_at).in_([(row.id, row.created_at) for row in claimed])
+    # 更新时再确认一次仍可领取：不支持 SKIP LOCKED 的数据库（SQLite）上并发领取可能读到同一批行，
+    # 只有先提交的一方更新成功
+    claimable = (table.c.order_status == 1) & (table.c.lease_expires_at <= func.now())
+    await db.execute(update(table).where(keys, claimable).values(lease_values(
+        lease_owner=worker_id, lease_expires_at=lease_deadline(conn.dialect, lease_seconds)
+    )))
+
+    result = await db.execute(
+        select(*TASK_DETAIL_COLUMNS, table.c.lease_expires_at)
+        .where(keys, table.c.lease_owner == worker_id)
+        .order_by(table.c.id)
+    )
+    rows = result.all()
+    claimed_ids = {row.id for row in rows}
+    requeued = sum(1 for row in claimed if row.id in claimed_ids and row.lease_owner is not None)
+    return rows, requeued
+
+
+async def renew_lease(db: AsyncSession, task_uuid: str, worker_id: str, lease_seconds: int) -> Optional[Row]:
+    """
+    延长 worker 持有的任务租约，返回 (id, lease_expires_at)
+
+    租约已到期但还没有被其他 worker 领走时同样可以续约；
+    任务不存在、已结束或已被其他 worker 领取时返回 None。调用方负责提交事务
+    """
+    table = OrderTask.__table__
+    conn = await db.connection()
+    result = await db.execute(
+        update(table)
+        .where(table.c.task_uuid == task_uuid, table.c.lease_owner == worker_id, table.c.order_status == 1)
+        .values(lease_values(lease_expires_at=lease_deadline(conn.dialect, lease_seconds)))
+    )
+    if not result.rowcount:
+        return None
+    result = await db.execute(select(table.c.id, table.c.lease_expires_at).where(table.c.task_uuid == task_uuid))
+    return result.first()
+
+
+async def release_lease(db: AsyncSession, task_uuid: str, worker_id: str) -> bool:
+    """
+    提前归还任务（worker 退出或放弃处理时调用），任务立即可以被重新领取
+
+    只有当前持有者可以归还，返回是否归还成功。调用方负责提交事务
+    """
+    table = OrderTask.__table__
+    result = await db.execute(
+        update(table)
+        .where(table.c.task_uuid == task_uuid, table.c.lease_owner == worker_id, table.c.order_status == 1)
+        .values(lease_values(lease_owner=None, lease_expires_at=func.now()))
+    )
+    return bool(result.rowcount)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+订单更新写入队列（write-behind，可选）
+
+开启后 PATCH /orders/{task_uuid} 不再直接写库：请求先追加到本地日志文件并 fsync，
+落盘后立即返回；后台任务每隔一个合并窗口把队列中的更新批量写入数据库。
+同一任务在窗口内的多次更新合并为一条 UPDATE，多个任务合并为一次事务提交。
+
+- 日志按组提交：并发请求的记录合并为一次 write + fsync
+- 记录落盘后才进入待写入队列：写入失败的请求返回错误，也不会被落库
+- 每次落库前轮换日志文件，与取出队列在同一把锁内完成：轮换出的文件恰好包含本次落库的请求，
+  提交成功后删除；进程崩溃后启动时重放未删除的日志
+- 每条请求按原样保存，落库时逐条应用状态规则（与直接更新的结果一致），完成时间取落库时间
+- 日志和待写入状态都在进程内，开启时只能以单 worker 运行
+
+环境变量：
+  WRITE_BEHIND_ENABLED  是否开启（默认关闭）
+  WRITE_BEHIND_WINDOW   合并窗口秒数（默认 0.5）
+  WRITE_BEHIND_JOURNAL  日志文件路径（默认 data/write_behind.journal）
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+from typing import Callable, Optional
+
+from src.database import async_session
+from src.events import publish_task_updates
+from src.logger import get_logger, log_event
+from src.models import UpdateOrderInfoRequest
+from src.order_updates import bulk_update_tasks, changes_status
+from src.replicas import pin_task_owners
+from src.task_cache import invalidate_updated_tasks
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_WINDOW = float(os.getenv("WRITE_BEHIND_WINDOW", "0.5"))
+WRITE_BEHIND_JOURNAL = os.getenv("WRITE_BEHIND_JOURNAL", "data/write_behind.journal")
+# 单个事务最多写入的请求数，与批量接口的上限一致
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("BATCH_MAX_SIZE", "500"))
+
+logger = get_logger("ordertracker.write_behind")
+
+
+class Journal:
+    """追加写日志，按组提交 fsync；所有文件写入都在 _lock 内串行执行"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = asyncio.Lock()
+        self._buffer: list[tuple[bytes, Callable[[], None], asyncio.Future]] = []
+        self._writer: Optional[asyncio.Task] = None
+        self._file = None
+
+    def open(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "ab")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def rotated_files(self) -> list[str]:
+        """尚未确认落库的轮换日志，按轮换顺序排列"""
+        return sorted(glob.glob(f"{self.path}.*"), key=lambda name: int(name.rsplit(".", 1)[1]))
+
+    def read_all(self) -> list[dict]:
+        """按写入顺序读取全部日志记录（启动时重放用），末尾写了一半的记录丢弃"""
+        records = []
+        for name in [*self.rotated_files(), self.path]:
+            if not os.path.exists(name):
+                continue
+            with open(name, "rb") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        log_event(logger, "journal_record_skipped", logging.WARNING, file=name)
+        return records
+
+    def append(self, record: dict, on_written: Callable[[], None]) -> asyncio.Future:
+        """
+        登记一条记录，返回落盘完成的 Future
+
+        on_written 在记录 fsync 成功后、释放文件锁之前调用，写入失败时不调用
+        """
+        future = asyncio.get_running_loop().create_future()
+        data = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+        self._buffer.append((data, on_written, future))
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._drain())
+        return future
+
+    async def _drain(self) -> None:
+        while self._buffer:
+            async with self._lock:
+                batch, self._buffer = self._buffer, []
+                try:
+                    await asyncio.to_thread(self._write, b"".join(data for data, _, _ in batch))
+                except Exception as e:
+                    for _, _, future in batch:
+                        future.set_exception(e)
+                else:
+                    for _, on_written, future in batch:
+                        on_written()
+                        future.set_result(None)
+
+    def _write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def rotate(self, take: Callable[[], dict]) -> dict:
+        """
+        把当前日志改名为轮换文件并新开一个日志（等待进行中的写入完成），返回 take() 的结果
+
+        take 在同一把锁内调用：此时已落盘的记录都在旧日志里，还在缓冲区的记录之后写入新日志
+        """
+        async with self._lock:
+            self._file.close()
+            existing = self.rotated_files()
+            sequence = int(existing[-1].rsplit(".", 1)[1]) + 1 if existing else 0
+            os.replace(self.path, f"{self.path}.{sequence}")
+            self._file = open(self.path, "ab")
+            return take()
+
+    def discard(self, rotated: list[str]) -> None:
+        """删除已确认落库的轮换日志"""
+        for name in rotated:
+            os.remove(name)
+
+
+class WriteBehindQueue:
+    """按任务合并的更新队列和后台落库任务"""
+
+    def __init__(self, journal_path: str, window: float):
+        self.journal = Journal(journal_path)
+        self.window = window
+        # {task_uuid: [按到达顺序排列的请求]}
+        self._pending: dict[str, list[UpdateOrderInfoRequest]] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._worker: Optional[asyncio.Task] = None
+
+    def pending_count(self) -> int:
+        return sum(len(requests) for requests in self._pending.values())
+
+    def pending_for(self, task_uuid: str) -> list[UpdateOrderInfoRequest]:
+        return list(self._pending.get(task_uuid, ()))
+
+    async def enqueue(self, task_uuid: str, order_info: UpdateOrderInfoRequest) -> None:
+        """
+        登记一条更新，日志落盘后返回
+
+        落盘成功后才进入内存队列（日志写入失败时抛出异常，更新不会被落库）；
+        入队与落盘在日志锁内完成，轮换日志时旧日志中的记录与取出的队列一一对应
+        """
+        def on_written():
+            self._pending.setdefault(task_uuid, []).append(order_info)
+            self._wakeup.set()
+
+        await self.journal.append({
+            "task_uuid": task_uuid,
+            "fields": order_info.model_dump(mode="json", exclude_none=True),
+        }, on_written)
+
+    async def start(self) -> None:
+        """重放上次未落库的日志并立即落库，然后启动后台任务"""
+        records = self.journal.read_all()
+        self.journal.open()
+        for record in records:
+            self._pending.setdefault(record["task_uuid"], []).append(UpdateOrderInfoRequest(**record["fields"]))
+        self._worker = asyncio.create_task(self._run())
+        if records:
+            log_event(logger, "write_behind_replayed", records=len(records))
+            try:
+                await self.flush()
+            except Exception as e:
+                # 数据库暂时不可用时不阻止启动，由后台任务继续重试
+                log_event(logger, "write_behind_flush_failed", logging.ERROR, error=str(e))
+                self._wakeup.set()
+
+    async def stop(self) -> None:
+        """停止后台任务并把队列中剩余的更新全部落库"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        await self.flush()
+        self.journal.close()
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.window)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # 失败的更新已放回队列，等下一个窗口重试
+                log_event(logger, "write_behind_flush_failed", logging.ERROR, error=str(e))
+                self._wakeup.set()
+
+    def _take_pending(self) -> dict[str, list[UpdateOrderInfoRequest]]:
+        batch, self._pending = self._pending, {}
+        return batch
+
+    async def flush(self) -> int:
+        """把当前队列中的更新写入数据库，返回落库的请求数"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch = await self.journal.rotate(self._take_pending)
+            rotated = self.journal.rotated_files()
+
+            items = [(task_uuid, order_info) for task_uuid, requests in batch.items() for order_info in requests]
+            async with async_session() as db:
+                try:
+                    updated = {}
+                    for start in range(0, len(items), WRITE_BEHIND_BATCH_SIZE):
+                        updated.update(await bulk_update_tasks(db, items[start:start + WRITE_BEHIND_BATCH_SIZE]))
+                    await db.commit()
+                except Exception:
+                    # 放回队列（排在新到达的更新之前），轮换日志保留到下次成功落库
+                    for task_uuid, requests in self._pending.items():
+                        batch.setdefault(task_uuid, []).extend(requests)
+                    self._pending = batch
+                    raise
+
+                self.journal.discard(rotated)
+                await pin_task_owners(db, list(updated))
+                await invalidate_updated_tasks(db, list(updated), [
+                    task_uuid for task_uuid, order_info in items
+                    if task_uuid in updated and changes_status(order_info)
+                ])
+                await publish_task_updates(db, list(updated))
+
+            missing = [task_uuid for task_uuid in batch if task_uuid not in updated]
+            log_event(
+                logger, "write_behind_flushed", requests=len(items), tasks=len(batch),
+                updated=len(updated), not_found=len(missing),
+                level=logging.WARNING if missing else logging.INFO,
+            )
+            return len(items)
+
+
+write_behind = WriteBehindQueue(WRITE_BEHIND_JOURNAL, WRITE_BEHIND_WINDOW)
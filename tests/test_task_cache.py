@@ -0,0 +1,81 @@
+"""
+当前任务缓存失效测试
+
+缓存写满、任务索引被 LRU 淘汰后，更新任务状态仍然要失效任务所属用户的当前任务缓存
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+# 配置在模块导入时读取，必须先于导入应用设置
+CACHE_SIZE = 8
+DB_PATH = os.path.join(tempfile.mkdtemp(), "task_cache.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["CURRENT_TASK_CACHE_SIZE"] = str(CACHE_SIZE)
+os.environ["CURRENT_TASK_CACHE_TTL"] = "60"
+
+import httpx
+
+import main
+from src.database import create_tables, get_async_engine
+from src.task_cache import current_task_cache
+
+
+def order(user_name: str, shop_name: str) -> dict:
+    return {
+        "user_name": user_name, "shop_name": shop_name, "product_url": "https://example.com/p",
+        "product_price": 9.9, "product_sku": "SKU",
+    }
+
+
+async def _current_after_update(update) -> dict:
+    """缓存当前任务并写满缓存淘汰任务索引，执行 update(client, task_uuid) 后再读当前任务"""
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        task_uuid = (await client.post("/orders", json=order("机器人1", f"店铺-{update.__name__}"))).json()["task_uuid"]
+        current = await client.get("/users/机器人1/orders/current")
+        assert current.json()["task"]["task_uuid"] == task_uuid
+
+        # 机器人持续轮询，其他用户的查询写满缓存：被淘汰的是没有读取的任务索引
+        for i in range(CACHE_SIZE * 2):
+            await client.get("/users/机器人1/orders/current")
+            await client.get(f"/users/其他用户{i}/orders/current")
+        assert await current_task_cache.backend.get(f"current-task:{task_uuid}") is None
+        assert await current_task_cache.get("机器人1") is not None
+
+        await update(client, task_uuid)
+        return (await client.get("/users/机器人1/orders/current")).json()
+
+
+async def complete(client, task_uuid):
+    await client.patch(f"/orders/{task_uuid}", json={"order_status": 2})
+
+
+async def bulk_fail(client, task_uuid):
+    await client.patch("/orders", json=[{"task_uuid": task_uuid, "order_status": 3}])
+
+
+async def auto_complete(client, task_uuid):
+    await client.patch(f"/orders/{task_uuid}", json={
+        "order_id": "ORDER-1", "alipay_trade_no": "TRADE-1", "receiver_name": "收货人"
+    })
+
+
+async def _run_updates() -> dict:
+    try:
+        return {update.__name__: await _current_after_update(update) for update in (complete, bulk_fail, auto_complete)}
+    finally:
+        # 关闭连接池：aiosqlite 的连接线程不随事件循环结束
+        await get_async_engine().dispose()
+
+
+def test_status_change_invalidates_after_index_evicted():
+    create_tables()
+    for name, current in asyncio.run(_run_updates()).items():
+        assert current["task"] is None, name